@@ -1,68 +1,197 @@
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from gomoku import Gomoku, GomokuBot, GomokuPos, BOARD_SIZE
+from gomoku import Gomoku, GomokuBot, GomokuPos, BOARD_SIZE, MAX_DEPTH, TranspositionTable
+from opening_book import load_book
+from position_cache import open_cache
+from threat_search import ThreatSpaceSearch
 
+# opening book dùng chung cho mọi ván (None nếu chưa tạo file book)
+BOOK = load_book()
+# bộ nhớ đệm các nước đi đã tìm được, dùng chung với các cửa sổ và ứng dụng khác (None nếu không mở được file)
+CACHE = open_cache()
+# tìm chuỗi thắng / chuỗi chặn ép buộc trước khi tìm kiếm alpha-beta
+THREAT_SEARCH = ThreatSpaceSearch()
+# thời gian tối đa của một lần tìm kiếm (nút "Move now" trả về nước đi tốt nhất tìm được tới lúc đó)
+BOT_TIME_BUDGET_MS = 20000
+# chu kỳ (ms) kiểm tra kết quả của luồng tìm kiếm trên luồng giao diện
+BOT_POLL_MS = 50
+
+
+class BotSearch(threading.Thread):
+    """
+    Luồng chạy GomokuBot.take_turn_alpha_beta trên một bản sao của game để giao diện không bị treo\n
+    progress (độ sâu đã tìm xong, số trạng thái) được cập nhật từ callback của bot, choice là kết quả khi luồng kết thúc
+    """
+    def __init__(self, game, tt):
+        super().__init__(daemon=True)
+        self.game = Gomoku(game)
+        self.bot = GomokuBot(self.game, tt=tt, book=BOOK, cache=CACHE, threat_search=THREAT_SEARCH,
+                             callback=self.on_stats, verbose=False)
+        self.started = time.perf_counter()
+        self.progress = (0, 0)
+        self.choice = None
+        self.error = None
+
+    def on_stats(self, stats):
+        # chạy trên luồng tìm kiếm, chỉ gán một tuple mới nên luồng giao diện luôn đọc được giá trị hoàn chỉnh
+        self.progress = (stats.depth, stats.nodes)
+
+    def run(self):
+        try:
+            self.choice = self.bot.take_turn_alpha_beta(time_budget_ms=BOT_TIME_BUDGET_MS)
+        except Exception as error:
+            self.error = error
+
+    def stop(self):
+        ''' Dừng tìm kiếm, choice sẽ là nước đi tốt nhất tìm được tới lúc đó '''
+        self.bot.stop()
 
 
 class GomokuGUI(tk.Toplevel):
-    def __init__(self, parent, who_go_first='BOT'):
+    """
+    Cửa sổ chơi với bot. Bot tìm kiếm trong một luồng riêng (BotSearch), kết quả được lấy bằng after() trên luồng giao diện\n
+    Trong lúc chờ người chơi, bot tìm trước nước trả lời cho nước đi mà nó dự đoán (pondering),
+    nếu người chơi đi đúng nước đó thì kết quả được dùng lại
+    """
+    def __init__(self, parent, who_go_first='BOT', size=BOARD_SIZE):
         super().__init__(parent)
         self.title("Welcome To Gomoku")
-        self.geometry("700x700")
+        self.geometry("700x760")
 
-        self.game = Gomoku()
-        self.bot = GomokuBot(self.game)
+        self.size = size
+        self.game = Gomoku(size=size)
+        # bảng tìm kiếm dùng chung cho mọi lần tìm kiếm (kể cả pondering) của cửa sổ này
+        self.tt = TranspositionTable()
+        # luồng tìm kiếm đang chạy hoặc vừa xong, pondering cho biết nó đang tìm trước cho nước dự đoán ponder_move
+        self.search = None
+        self.pondering = False
+        self.ponder_move = None
         self.who_go_first = who_go_first
         self.last_possition = GomokuPos()
 
         self.create_widgets()
         self.place_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.close)
 
         if self.who_go_first == "BOT":
             self.bot_move()
-        else:
-            self.bot.name = 'O'
 
     def create_widgets(self):
         self.fra_blanks = ttk.Frame(self)
-        self.labels = [[None for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+        self.labels = [[None for _ in range(self.size)] for _ in range(self.size)]
 
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
+        for i in range(self.size):
+            for j in range(self.size):
                 self.labels[i][j] = tk.Label(self.fra_blanks, width=2, height=1, text='', relief=tk.RAISED, bg='white', font=("Helvetica", 16))
                 self.labels[i][j].grid(row=i, column=j, sticky='nsew')
                 self.labels[i][j].bind('<Button-1>', lambda e, row=i, col=j: self.make_move(row, col))
 
         self.status_label = ttk.Label(self, text="", font=("Helvetica", 16))
+        self.fra_controls = ttk.Frame(self)
+        self.progress = ttk.Progressbar(self.fra_controls, maximum=MAX_DEPTH, length=300)
+        self.btn_move_now = ttk.Button(self.fra_controls, text="Move now", command=self.move_now, state=tk.DISABLED)
         
     def place_widgets(self):
         self.fra_blanks.grid(row=0, column=0)
-        self.status_label.grid(row=BOARD_SIZE, columnspan=10)
+        self.status_label.grid(row=self.size, columnspan=10)
+        self.fra_controls.grid(row=self.size + 1, columnspan=10)
+        self.progress.grid(row=0, column=0, padx=5)
+        self.btn_move_now.grid(row=0, column=1, padx=5)
 
     def bot_move(self):
         self.status_label.config(text="Bot is thinking... be patient...")
-        self.update()
-        print("Bot is thinking...")
-        self.bot.take_turn_alpha_beta()
+        self.progress['value'] = 0
+        self.btn_move_now.config(state=tk.NORMAL)
+        self.start_search(self.game)
+
+    def start_search(self, game):
+        self.search = BotSearch(game, self.tt)
+        self.search.start()
+        self.after(BOT_POLL_MS, self.poll_search, self.search)
+
+    def poll_search(self, search):
+        ''' Chạy trên luồng giao diện: cập nhật tiến độ, và đi nước của bot khi luồng tìm kiếm kết thúc '''
+        if search is not self.search:
+            # lần tìm kiếm đã bị bỏ (người chơi không đi nước được dự đoán, hoặc ván mới)
+            return
+        if search.is_alive():
+            if not self.pondering:
+                depth, nodes = search.progress
+                self.progress['value'] = depth
+                self.status_label.config(text=f"Bot is thinking... depth {depth}/{MAX_DEPTH}, {nodes} nodes, "
+                                              f"{time.perf_counter() - search.started:.1f}s")
+            self.after(BOT_POLL_MS, self.poll_search, search)
+        elif not self.pondering:
+            self.finish_bot_move(search)
+        # pondering đã xong: kết quả được giữ lại cho tới khi người chơi đi
+
+    def finish_bot_move(self, search):
+        self.search = None
+        self.btn_move_now.config(state=tk.DISABLED)
+        if search.error is not None:
+            messagebox.showerror("Bot error", str(search.error))
+            return
         print("Bot done thinking.")
         self.status_label.config(text="Bot done thinking.")
-        self.game.move(self.bot.choice)
-        self.update_board(self.bot.choice)
-        self.update()
+        self.progress['value'] = self.progress['maximum']
+        self.game.move(search.choice)
+        self.update_board(search.choice)
+        if self.game.over():
+            self.show_result()
+        else:
+            self.start_pondering(search.bot.pv)
+
+    def start_pondering(self, pv):
+        ''' Tìm trước nước trả lời cho nước đi tiếp theo của người chơi trong principal variation của bot '''
+        if len(pv) < 2 or self.game.have_occupied(pv[1]):
+            return
+        game = Gomoku(self.game)
+        game.move(pv[1])
+        if game.over():
+            return
+        self.pondering = True
+        self.ponder_move = pv[1]
+        self.start_search(game)
+
+    def stop_search(self):
+        ''' Dừng và bỏ lần tìm kiếm đang chạy (nếu có) '''
+        if self.search is not None:
+            self.search.stop()
+            self.search.join()
+        self.search = None
+        self.pondering = False
+        self.ponder_move = None
+
+    def move_now(self):
+        if self.search is not None and not self.pondering:
+            self.search.stop()
 
     def human_move(self, row, col):
         self.game.move(GomokuPos(row, col))
         self.update_board(GomokuPos(row, col))
-        self.update()
 
     def make_move(self, row, col):
+        pos = GomokuPos(row, col)
+        # không nhận nước đi khi bot đang nghĩ
+        if (self.search is not None and not self.pondering) or self.game.have_occupied(pos):
+            return
         self.human_move(row, col)
         if self.game.over():
+            self.stop_search()
             self.show_result()
+        elif self.pondering and pos == self.ponder_move:
+            # đoán đúng nước đi: lần tìm kiếm trước chính là lần tìm kiếm cho nước đi này
+            self.pondering = False
+            self.ponder_move = None
+            self.btn_move_now.config(state=tk.NORMAL)
+            self.status_label.config(text="Bot is thinking... be patient...")
+            if not self.search.is_alive():
+                self.finish_bot_move(self.search)
         else:
+            self.stop_search()
             self.bot_move()
-            if self.game.over():
-                self.show_result()
 
     def update_board(self, pos=None):
         if pos is not None:
@@ -79,8 +208,8 @@ class GomokuGUI(tk.Toplevel):
             self.labels[self.last_possition.x][self.last_possition.y].config(bg='white')
             self.last_possition = GomokuPos(x, y)
         else:
-            for i in range(BOARD_SIZE):
-                for j in range(BOARD_SIZE):
+            for i in range(self.size):
+                for j in range(self.size):
                     self.labels[i][j]['text'] = ''
 
     def show_result(self):
@@ -91,14 +220,16 @@ class GomokuGUI(tk.Toplevel):
             winner = "Player X" if result == 'X' else "Player O"
             messagebox.showinfo("Game Over", f"{winner} wins!")
 
-        self.game = Gomoku()
-        self.bot = GomokuBot(self.game)
+        self.stop_search()
+        self.game = Gomoku(size=self.size)
         self.update_board()
         self.update()
         if self.who_go_first == "BOT":
             self.bot_move()
-        else:
-            self.bot.name = 'O'
+
+    def close(self):
+        self.stop_search()
+        self.destroy()
 
 
 class GomokuSelector(tk.Tk):
@@ -116,19 +247,25 @@ class GomokuSelector(tk.Tk):
         self.cb_who_go_first = ttk.Combobox(self.fra_user_options, values=('YOU', 'BOT'), state='readonly')
         self.cb_who_go_first.set('BOT')
 
+        self.lbl_board_size = ttk.Label(self.fra_user_options, text="Board size:")
+        self.cb_board_size = ttk.Combobox(self.fra_user_options, values=(15, 19, 20), state='readonly')
+        self.cb_board_size.set(BOARD_SIZE)
+
         self.btn_play = ttk.Button(self.fra_user_options, text="Play")
 
     def place_widgets(self):
         self.lbl_who_go_first.grid(row=2, column=0)
         self.cb_who_go_first.grid(row=3, column=0)
-        self.btn_play.grid(row=4, column=0)
+        self.lbl_board_size.grid(row=4, column=0)
+        self.cb_board_size.grid(row=5, column=0)
+        self.btn_play.grid(row=6, column=0)
         self.fra_user_options.grid(row=1, column=0)
 
     def associate_events(self):
         self.btn_play.bind("<Button-1>", lambda e: self.btn_play_Button_1())
 
     def btn_play_Button_1(self):
-        tic_tac_toe_gui = GomokuGUI(self, self.cb_who_go_first.get())
+        tic_tac_toe_gui = GomokuGUI(self, self.cb_who_go_first.get(), int(self.cb_board_size.get()))
         tic_tac_toe_gui.grab_set()
 
 
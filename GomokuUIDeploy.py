@@ -1,12 +1,23 @@
 import streamlit as st
 import pandas as pd
 import string
-from gomoku import Gomoku, GomokuBot, GomokuPos, BOARD_SIZE
+from gomoku import Gomoku, GomokuPos, BOARD_SIZE
+from bot_service import BotService
 import time
+import uuid
 
 
 BOT_MOVE_LETTER = 'X'
 HUMAN_MOVE_LETTER = 'O'
+# thời gian chờ giữa 2 lần hỏi dịch vụ bot xem đã tìm xong nước đi chưa
+BOT_POLL_INTERVAL = 0.3
+
+
+@st.cache_resource
+def get_bot_service():
+    # một dịch vụ bot duy nhất cho mọi phiên, bảng tìm kiếm của từng phiên được giữ lại giữa các nước đi
+    return BotService()
+
 row_names = list(range(1, BOARD_SIZE + 1))
 column_names = list(string.ascii_uppercase)[:BOARD_SIZE] # ['A', ..., 'T']
 
@@ -23,16 +34,23 @@ status_bar.markdown(f"**Your turn...**", unsafe_allow_html=True)
 
 
 def bot_make_move():
-    status_bar.markdown(f"**Bot is thinking, please be patient... ^^**", unsafe_allow_html=True)
-    game = Gomoku.deserialize(st.session_state.game)
-    bot = GomokuBot(game)
-    bot_turn = bot.take_turn_alpha_beta()
+    service = get_bot_service()
+    if st.session_state.bot_job is None:
+        st.session_state.bot_job = service.submit(st.session_state.session_id, st.session_state.game)
+    bot_turn = service.poll(st.session_state.bot_job)
+    if bot_turn is None:
+        # bot vẫn đang tìm: không chặn phiên, chờ một chút rồi hỏi lại
+        status_bar.markdown(f"**Bot is thinking, please be patient... ^^**", unsafe_allow_html=True)
+        time.sleep(BOT_POLL_INTERVAL)
+        st.rerun()
+    st.session_state.bot_job = None
+    game = Gomoku.from_bytes(st.session_state.game)
     bot_number_row, bot_letter_column = bot_turn.to_standard_pos()
     game.move(bot_turn)
     draw_to_UI(bot_number_row, bot_letter_column, BOT_MOVE_LETTER)
     status_bar.markdown("**Bot moved!**", unsafe_allow_html=True)
-    st.session_state.game = game.serialize()
-    st.session_state.winner = Gomoku.deserialize(st.session_state.game).win()
+    st.session_state.game = game.to_bytes()
+    st.session_state.winner = Gomoku.peek_status(st.session_state.game)
     st.session_state.current_is_human_move = True
     st.rerun()
 
@@ -46,14 +64,16 @@ def show_winner(winner):
 
 
 if st.button('Move'):
-    if st.session_state.winner == 'N':
-        game = Gomoku.deserialize(st.session_state.game)
+    if st.session_state.winner == 'N' and st.session_state.bot_job is not None:
+        status_bar.markdown(f"*Please wait for the bot to move!*")
+    elif st.session_state.winner == 'N':
+        game = Gomoku.from_bytes(st.session_state.game)
         gomoku_pos = GomokuPos.to_gomoku_pos(row, col)
         if not game.have_occupied(gomoku_pos):
             draw_to_UI(row, col, HUMAN_MOVE_LETTER)
             game.move(GomokuPos.to_gomoku_pos(row, col))
-            st.session_state.game = game.serialize()
-            st.session_state.winner = Gomoku.deserialize(st.session_state.game).win()
+            st.session_state.game = game.to_bytes()
+            st.session_state.winner = Gomoku.peek_status(st.session_state.game)
             st.session_state.current_is_human_move = False
             st.rerun()
         else:
@@ -62,7 +82,10 @@ if st.button('Move'):
 
 if st.button('Replay'):
     # Reset the game state
-    st.session_state.game = Gomoku().serialize()
+    if st.session_state.bot_job is not None:
+        get_bot_service().cancel(st.session_state.bot_job)
+        st.session_state.bot_job = None
+    st.session_state.game = Gomoku().to_bytes()
     # Reset the DataFrame
     data = pd.DataFrame([[' ' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)])
     data.columns = column_names
@@ -76,7 +99,7 @@ if st.button('Replay'):
     
 
 if 'game' not in st.session_state:
-    st.session_state.game = Gomoku().serialize()
+    st.session_state.game = Gomoku().to_bytes()
     data = pd.DataFrame([[' ' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)])
     data.columns = column_names
     data.index = row_names
@@ -85,6 +108,8 @@ if 'game' not in st.session_state:
     st.session_state.have_not_any_move_yet = True
     st.session_state.current_is_human_move = False
     st.session_state.winner = 'N'
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.bot_job = None
 elif st.session_state.winner != 'N':
     show_winner(st.session_state.winner)
 
@@ -0,0 +1,155 @@
+'''
+Benchmark the Gomoku engine on the fixed positions in positions.json
+
+Usage:
+    python benchmarks/run_benchmarks.py [--repeat 20] [--backend list|bitboard|numpy] [--algorithm minimax|pvs] [--batch-eval] [--move-ordering] [--output result.json] [--update-expected]
+
+Prints (or writes) a JSON report with p50/p95/p99 latencies (ms) of Gomoku.win, threat_scores,
+get_best_moves and GomokuBot.take_turn_alpha_beta, the search nodes per second, and whether the bot still
+chooses the expected move of every position. Exits with status 1 when a chosen move changed.
+'''
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gomoku import Gomoku, GomokuBot, MAX_DEPTH
+from gomoku_bitboard import BitboardGomoku
+from gomoku_numpy import NumpyGomoku
+
+POSITIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'positions.json')
+BACKENDS = {'list': Gomoku, 'bitboard': BitboardGomoku, 'numpy': NumpyGomoku}
+
+
+def load_position(position):
+    ''' Tạo Gomoku từ một vị trí trong positions.json ('.' là ô trống) '''
+    game = Gomoku.deserialize(json.dumps({
+        'board': [['N' if cell == '.' else cell for cell in row] for row in position['board']],
+        'active_turn': position['active_turn'],
+    }))
+    return game
+
+
+def percentiles(samples):
+    ''' p50/p95/p99 (nearest rank) và trung bình của samples (giây), đổi ra mili giây '''
+    samples = sorted(samples)
+
+    def rank(p):
+        return samples[min(len(samples) - 1, max(0, -(-p * len(samples) // 100) - 1))] * 1000
+
+    return {'p50': rank(50), 'p95': rank(95), 'p99': rank(99), 'mean': sum(samples) / len(samples) * 1000}
+
+
+def time_calls(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def benchmark_position(position, backend, repeat, seed, max_depth, batch_eval=False, move_ordering=False, algorithm='minimax'):
+    game = load_position(position)
+    board = backend(game)
+    opponent = 'O' if game.active_turn == 'X' else 'X'
+    result = {
+        'name': position['name'],
+        'category': position['category'],
+        'win': time_calls(board.win, repeat),
+        'threat_scores': time_calls(lambda: (board.threat_scores(game.active_turn), board.threat_scores(opponent)), repeat),
+        'get_best_moves': time_calls(lambda: board.get_best_moves(random.Random(seed)), repeat),
+    }
+
+    samples = []
+    nodes = 0
+    first_move_cutoffs = cutoffs = 0
+    choices = set()
+    for _ in range(repeat):
+        # mỗi lần tìm kiếm dùng bảng và seed mới để các lần đo giống hệt nhau
+        bot = GomokuBot(game, backend=backend, max_depth=max_depth, seed=seed, verbose=False, batch_eval=batch_eval,
+                        move_ordering=move_ordering, algorithm=algorithm)
+        start = time.perf_counter()
+        choice = bot.take_turn_alpha_beta()
+        samples.append(time.perf_counter() - start)
+        nodes += bot.stats.nodes
+        first_move_cutoffs += bot.stats.first_move_cutoffs
+        cutoffs += sum(bot.stats.cutoffs_by_depth.values())
+        choices.add((choice.x, choice.y))
+    result['take_turn_alpha_beta'] = percentiles(samples)
+    result['nodes'] = nodes // repeat
+    result['nodes_per_second'] = nodes / sum(samples)
+    result['first_move_cutoff_rate'] = first_move_cutoffs / cutoffs if cutoffs else 0.0
+    result['chosen_moves'] = sorted(choices)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--positions', default=POSITIONS_FILE)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='list')
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH)
+    parser.add_argument('--algorithm', choices=GomokuBot.ALGORITHMS, default='minimax')
+    parser.add_argument('--batch-eval', action='store_true', help='order the search children with GomokuBot(batch_eval=True)')
+    parser.add_argument('--move-ordering', action='store_true', help='order the search moves with GomokuBot(move_ordering=True)')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    parser.add_argument('--update-expected', action='store_true', help='store the chosen moves as the expected moves')
+    args = parser.parse_args()
+
+    with open(args.positions) as f:
+        suite = json.load(f)
+    seed = suite.get('seed', 0)
+
+    results = []
+    changed = []
+    for position in suite['positions']:
+        result = benchmark_position(position, BACKENDS[args.backend], args.repeat, seed, args.max_depth, args.batch_eval,
+                                    args.move_ordering, args.algorithm)
+        expected = position.get('expected_move')
+        result['expected_move'] = expected
+        result['move_unchanged'] = expected is not None and result['chosen_moves'] == [tuple(expected)]
+        if args.update_expected:
+            position['expected_move'] = list(result['chosen_moves'][0])
+        elif not result['move_unchanged']:
+            changed.append(position['name'])
+        results.append(result)
+
+    total_nodes = sum(result['nodes'] for result in results)
+    total_time = sum(result['take_turn_alpha_beta']['mean'] for result in results) / 1000
+    report = {
+        'backend': args.backend,
+        'max_depth': args.max_depth,
+        'algorithm': args.algorithm,
+        'batch_eval': args.batch_eval,
+        'move_ordering': args.move_ordering,
+        'repeat': args.repeat,
+        'seed': seed,
+        'positions': results,
+        'summary': {
+            'nodes_per_second': total_nodes / total_time if total_time else 0.0,
+            'search_time_ms': total_time * 1000,
+            'changed_moves': changed,
+        },
+    }
+
+    if args.update_expected:
+        with open(args.positions, 'w') as f:
+            json.dump(suite, f, indent=2)
+            f.write('\n')
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if changed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
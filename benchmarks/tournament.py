@@ -0,0 +1,225 @@
+'''
+Self-play tournament between two GomokuBot configurations, used to check that a change does not weaken the bot
+
+Usage:
+    python benchmarks/tournament.py [--baseline '{"max_depth": 4}'] [--candidate '{"max_depth": 4, "algorithm": "pvs"}']
+                                    [--games 40] [--opening-plies 4] [--size 20] [--workers N] [--seed 0]
+                                    [--log games.jsonl] [--output result.json]
+
+A configuration is a JSON object of GomokuBot options (backend is 'list', 'bitboard' or 'numpy'), plus:
+    "book": true            use the opening book
+    "threat_search": true   run ThreatSpaceSearch before alpha-beta (limited by nodes only, so games are repeatable)
+    "node_budget": N        passed to take_turn_alpha_beta (time_budget_ms is accepted too, but makes games not repeatable)
+
+Every opening (a few random stones near the center) is played twice, once with each bot as X. Games run in parallel
+in a process pool, and every game is reproducible from --seed. Each game is one line of the --log file:
+the opening, the moves as [x, y, milliseconds, alpha-beta nodes, threat-space search nodes] and the result.
+
+Prints (or writes) a JSON report with the candidate score (wins + draws / 2), its 95% Wilson interval,
+the Elo difference and a throughput summary (nodes per second counts both alpha-beta and threat-space search nodes,
+since the move latency includes both). Exits with status 1 when the candidate is significantly weaker
+(the upper bound of the interval is below 0.5).
+'''
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gomoku import BOARD_SIZE, Gomoku, GomokuBot, GomokuPos, TranspositionTable
+from opening_book import load_book
+from threat_search import ThreatSpaceSearch
+
+from run_benchmarks import BACKENDS, percentiles
+
+# các tùy chọn không phải là tham số của GomokuBot
+TURN_OPTIONS = ('node_budget', 'time_budget_ms')
+# z của khoảng tin cậy 95%
+CONFIDENCE_Z = 1.96
+# mỗi nước đi đầu ván được chọn ngẫu nhiên trong hình vuông cạnh 2 * OPENING_RADIUS + 1 quanh tâm bàn cờ
+OPENING_RADIUS = 3
+
+
+def make_opening(size, plies, rng):
+    ''' plies nước đi ngẫu nhiên, khác nhau, gần tâm bàn cờ size x size '''
+    center = size // 2
+    cells = [(x, y) for x in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1)
+             for y in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1)]
+    return rng.sample(cells, plies)
+
+
+def make_bot(game, options, tt, seed):
+    ''' GomokuBot cho người chơi đang tới lượt của game theo cấu hình options '''
+    options = {key: value for key, value in options.items() if key not in TURN_OPTIONS}
+    options['backend'] = BACKENDS[options.get('backend', 'list')]
+    if options.pop('book', False):
+        options['book'] = load_book()
+    if options.pop('threat_search', False):
+        # mặc định chỉ giới hạn theo số trạng thái nên ván đấu lặp lại được
+        options['threat_search'] = ThreatSpaceSearch()
+    return GomokuBot(game, tt=tt, seed=seed, verbose=False, **options)
+
+
+def play_game(task):
+    '''
+    Chạy trong tiến trình con: chơi 1 ván, trả về dict của ván đó (cùng định dạng với 1 dòng của file log)\n
+    players là (cấu hình của X, cấu hình của O), names là tên của 2 bot theo cùng thứ tự
+    '''
+    index, opening, players, names, size, seed = task
+    rng = random.Random(seed)
+    game = Gomoku(size=size)
+    for x, y in opening:
+        game.move(GomokuPos(x, y))
+    # mỗi bot có bảng tìm kiếm riêng, được giữ lại giữa các nước đi của ván
+    tables = {'X': TranspositionTable(), 'O': TranspositionTable()}
+    options = dict(zip('XO', players))
+    moves = []
+    status = game.win()
+    while status == 'N':
+        side = game.active_turn
+        bot = make_bot(game, options[side], tables[side], rng.getrandbits(32))
+        turn_options = {key: options[side][key] for key in TURN_OPTIONS if key in options[side]}
+        start = time.perf_counter()
+        choice = bot.take_turn_alpha_beta(**turn_options)
+        elapsed = time.perf_counter() - start
+        game.move(choice)
+        # thời gian của nước đi gồm cả threat-space search chạy trước alpha-beta nên số trạng thái của nó cũng được ghi lại
+        threat_nodes = bot.threat_search.nodes if bot.threat_search is not None else 0
+        moves.append([choice.x, choice.y, round(elapsed * 1000, 1), bot.stats.nodes, threat_nodes])
+        status = game.win(last_move_only=True)
+
+    winner = None if status == 'T' else names['XO'.index(status)]
+    return {'game': index, 'x': names[0], 'o': names[1], 'opening': opening, 'moves': moves, 'winner': winner}
+
+
+def wilson_interval(score, games, z=CONFIDENCE_Z):
+    ''' Khoảng tin cậy Wilson của tỉ lệ score trên games ván (hòa được tính là nửa ván thắng) '''
+    if not games:
+        return 0.0, 1.0
+    denominator = 1 + z * z / games
+    center = (score + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(score * (1 - score) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def elo_difference(score):
+    ''' Chênh lệch Elo ứng với tỉ lệ điểm score (None nếu thắng / thua tất cả vì khi đó chênh lệch là vô cùng) '''
+    if score <= 0 or score >= 1:
+        return None
+    return -400 * math.log10(1 / score - 1)
+
+
+def summarize(results, wall_time):
+    ''' Báo cáo kết quả và tốc độ từ các ván đã chơi '''
+    games = len(results)
+    wins = sum(result['winner'] == 'candidate' for result in results)
+    losses = sum(result['winner'] == 'baseline' for result in results)
+    draws = games - wins - losses
+    score = (wins + draws / 2) / games if games else 0.0
+    low, high = wilson_interval(score, games)
+
+    # độ trễ và số trạng thái (alpha-beta, threat-space search) của từng nước đi, theo từng bot (không tính các nước của opening)
+    latencies = {'baseline': [], 'candidate': []}
+    nodes = {'baseline': 0, 'candidate': 0}
+    threat_nodes = {'baseline': 0, 'candidate': 0}
+    for result in results:
+        for ply, (_, _, milliseconds, move_nodes, move_threat_nodes) in enumerate(result['moves']):
+            # nước đi đầu tiên sau opening thuộc về người tới lượt sau opening
+            side = 'xo'[(len(result['opening']) + ply) % 2]
+            name = result[side]
+            latencies[name].append(milliseconds / 1000)
+            nodes[name] += move_nodes
+            threat_nodes[name] += move_threat_nodes
+
+    players = {}
+    for name, samples in latencies.items():
+        search_time = sum(samples)
+        players[name] = {
+            'moves': len(samples),
+            'move_latency_ms': percentiles(samples) if samples else None,
+            'nodes': nodes[name],
+            'threat_search_nodes': threat_nodes[name],
+            'nodes_per_second': (nodes[name] + threat_nodes[name]) / search_time if search_time else 0.0,
+        }
+    total_moves = sum(len(result['moves']) for result in results)
+    return {
+        'games': games,
+        'candidate_wins': wins,
+        'candidate_losses': losses,
+        'draws': draws,
+        'candidate_score': score,
+        'score_interval_95': [low, high],
+        'elo_difference': elo_difference(score),
+        'significantly_weaker': high < 0.5,
+        'players': players,
+        'throughput': {
+            'wall_time_s': wall_time,
+            'games_per_minute': games / wall_time * 60 if wall_time else 0.0,
+            'moves_per_second': total_moves / wall_time if wall_time else 0.0,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', type=json.loads, default={'max_depth': 4}, help='JSON options of the reference bot')
+    parser.add_argument('--candidate', type=json.loads, default={'max_depth': 4}, help='JSON options of the bot being tested')
+    parser.add_argument('--games', type=int, default=40, help='number of games (rounded up to an even number)')
+    parser.add_argument('--opening-plies', type=int, default=4, help='number of random stones placed before the bots play')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE, help='board size')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log', help='write one JSON line per game to this file')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    configs = {'baseline': args.baseline, 'candidate': args.candidate}
+    tasks = []
+    for pair in range((args.games + 1) // 2):
+        opening = make_opening(args.size, args.opening_plies, rng)
+        for names in (('baseline', 'candidate'), ('candidate', 'baseline')):
+            players = tuple(configs[name] for name in names)
+            tasks.append((len(tasks), opening, players, names, args.size, rng.getrandbits(32)))
+
+    start = time.perf_counter()
+    results = []
+    log = open(args.log, 'w') if args.log else None
+    try:
+        if log is not None:
+            log.write(json.dumps({'baseline': args.baseline, 'candidate': args.candidate, 'size': args.size,
+                                  'seed': args.seed}, separators=(',', ':')) + '\n')
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for result in executor.map(play_game, tasks):
+                results.append(result)
+                if log is not None:
+                    log.write(json.dumps(result, separators=(',', ':')) + '\n')
+    finally:
+        if log is not None:
+            log.close()
+    wall_time = time.perf_counter() - start
+
+    report = {
+        'baseline': args.baseline,
+        'candidate': args.candidate,
+        'size': args.size,
+        'opening_plies': args.opening_plies,
+        'seed': args.seed,
+        'summary': summarize(results, wall_time),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if report['summary']['significantly_weaker'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import os
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from gomoku import Gomoku, GomokuBot, GomokuPos, TranspositionTable
+from opening_book import load_book
+from position_cache import open_cache
+from threat_search import ThreatSpaceSearch
+
+# số phiên tối đa mà mỗi tiến trình giữ bảng tìm kiếm, phiên lâu nhất không dùng sẽ bị bỏ trước
+MAX_SESSIONS_PER_WORKER = 64
+SESSION_TT_MEGABYTES = 4
+
+# chỉ tồn tại trong các tiến trình con: session_id -> TranspositionTable của phiên đó
+_SESSION_TABLES = OrderedDict()
+
+
+def _session_table(session_id):
+    tt = _SESSION_TABLES.pop(session_id, None)
+    if tt is None:
+        tt = TranspositionTable(SESSION_TT_MEGABYTES)
+    _SESSION_TABLES[session_id] = tt
+    while len(_SESSION_TABLES) > MAX_SESSIONS_PER_WORKER:
+        _SESSION_TABLES.popitem(last=False)
+    return tt
+
+
+@lru_cache(maxsize=None)
+def _opening_book():
+    ''' Mỗi tiến trình con mở (map vào bộ nhớ) opening book đúng 1 lần '''
+    return load_book()
+
+
+@lru_cache(maxsize=None)
+def _position_cache():
+    ''' Mỗi tiến trình con mở một kết nối tới bộ nhớ đệm trên đĩa, dùng chung với các tiến trình và ứng dụng khác (None nếu không mở được) '''
+    return open_cache()
+
+
+@lru_cache(maxsize=None)
+def _threat_search():
+    ''' Threat-space search của tiến trình con, chạy trước mỗi lần tìm kiếm alpha-beta '''
+    return ThreatSpaceSearch()
+
+
+def _search(session_id, game_data, bot_options):
+    ''' Chạy trong tiến trình con: tìm nước đi cho bàn cờ game_data, dùng lại bảng tìm kiếm của phiên '''
+    game = Gomoku.from_bytes(game_data)
+    bot = GomokuBot(game, tt=_session_table(session_id), book=_opening_book(), cache=_position_cache(),
+                    threat_search=_threat_search(), **bot_options)
+    choice = bot.take_turn_alpha_beta()
+    return choice.x, choice.y
+
+
+def _forget(session_id):
+    _SESSION_TABLES.pop(session_id, None)
+
+
+class BotService:
+    """
+    Dịch vụ bot chạy lâu dài trong máy, dùng chung cho mọi phiên của ứng dụng web\n
+    Mỗi phiên luôn được gửi tới cùng một tiến trình con nên bảng tìm kiếm của phiên đó được giữ lại giữa các nước đi\n
+    Usage:\n
+    job_id = service.submit(session_id, game.to_bytes()), sau đó gọi service.poll(job_id) cho tới khi nhận được GomokuPos
+    """
+    def __init__(self, workers=None, **bot_options):
+        workers = workers or os.cpu_count() or 1
+        # mỗi tiến trình con chỉ có 1 luồng để các phiên gửi tới nó luôn gặp lại bảng tìm kiếm của mình
+        self.executors = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+        # các tiến trình con chạy nền nên mặc định không in gì ra
+        bot_options.setdefault('verbose', False)
+        self.bot_options = bot_options
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def _executor(self, session_id):
+        return self.executors[zlib.crc32(session_id.encode()) % len(self.executors)]
+
+    def submit(self, session_id, game_data):
+        ''' Gửi bàn cờ (chuỗi byte Gomoku.to_bytes) cần tìm nước đi, trả về job_id dùng cho poll '''
+        job_id = uuid.uuid4().hex
+        future = self._executor(session_id).submit(_search, session_id, game_data, self.bot_options)
+        with self.lock:
+            self.jobs[job_id] = future
+        return job_id
+
+    def poll(self, job_id):
+        '''
+        Trả về GomokuPos nếu việc tìm kiếm đã xong (chỉ trả về 1 lần), None nếu vẫn đang tìm\n
+        Ném lại lỗi của tiến trình con nếu việc tìm kiếm bị lỗi
+        '''
+        with self.lock:
+            future = self.jobs.get(job_id)
+            if future is None:
+                raise KeyError(f"Unknown bot job: {job_id}")
+            if not future.done():
+                return None
+            del self.jobs[job_id]
+        x, y = future.result()
+        return GomokuPos(x, y)
+
+    def cancel(self, job_id):
+        ''' Bỏ kết quả của job_id (ví dụ khi người chơi chơi lại từ đầu) '''
+        with self.lock:
+            future = self.jobs.pop(job_id, None)
+        if future is not None:
+            future.cancel()
+
+    def forget(self, session_id):
+        ''' Bỏ bảng tìm kiếm của phiên đã kết thúc '''
+        self._executor(session_id).submit(_forget, session_id)
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(cancel_futures=True)
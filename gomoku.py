@@ -1,18 +1,216 @@
 import random
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
 
+# kích thước bàn cờ và số quân liên tiếp để thắng mặc định, mỗi Gomoku có thể dùng giá trị khác (xem BoardGeometry)
 BOARD_SIZE = 20
+WIN_LENGTH = 5
 MINIMAX_INFINITY = 999
 MAX_DEPTH = 6
 
 
+# điểm hăm dọa dùng cộng thêm nếu như xuất hiện 2 hay nhiều nước hăm dọa được dồn vào cùng 1 vị trí
+EXTRA_THREATENING_POINT = 0.5
+
+
+def get_threatening_patterns(opponent, win_length=WIN_LENGTH):
+    '''
+    Trả về danh sách những mẫu/chuỗi trường hợp hăm dọa thường thấy của opponent\n
+    Ví dụ "{1}{0}{0}{0}{0}N".format(opponent, me)
+    Chuỗi này có nghĩa là opponent đã đi được 4 nước liên tiếp, bị chặn 1 đầu và đầu còn lại chưa được đi\n
+    Với win_length khác 5, các chuỗi quân được kéo dài thêm win_length - 5 quân (đường 4 là win_length - 1 quân,...)
+    '''
+    # me là nước đi có vai trò chặn opponent
+    me = 'X' if opponent == 'O' else 'O'
+    # {2} là các quân thêm vào khi win_length > 5
+    extra = opponent * (win_length - 5)
+    patterns = ["{1}{2}{0}{0}{0}{0}N", "N{0}{0}{0}{0}{2}{1}", "{2}{0}{0}{0}{0}N", "N{0}{0}{0}{0}{2}"]
+    # đường 4 bị ngắt quãng: ô trống ở giữa cửa sổ win_length ô
+    patterns += [_gapped(win_length, gaps) for gaps in [(win_length - 2,), (1,)] + [(k,) for k in range(2, win_length - 2)]]
+    # đường 3 bị ngắt quãng, đường 3 mở
+    patterns += ["N" + _gapped(win_length - 1, (k,)) + "N" for k in range(1, win_length - 2)]
+    patterns += ["N{2}{0}{0}{0}N", "{1}N{2}{0}{0}{0}NN", "NN{0}{0}{0}{2}N{1}", "{1}{2}{0}{0}{0}NN", "NN{0}{0}{0}{2}{1}"]
+    patterns += [_gapped(win_length, gaps) for gaps in _spaced_gaps(win_length)]
+    # đường 2
+    patterns += ["N{2}{0}{0}NN", "NN{0}{0}{2}N"]
+    patterns += ["N" + _gapped(win_length - 2, (k,)) + "N" for k in range(1, win_length - 3)]
+    return [pattern.format(opponent, me, extra) for pattern in patterns]
+
+
+def _gapped(length, gaps):
+    ''' Mẫu dài length ô toàn quân {0}, trừ các vị trí gaps là ô trống '''
+    return ''.join('N' if k in gaps else '{0}' for k in range(length))
+
+
+def _spaced_gaps(win_length):
+    ''' Các cặp vị trí trống không kề nhau và không nằm ở 2 đầu của cửa sổ win_length ô (với 5 chỉ có "{0}N{0}N{0}") '''
+    return [(i, j) for i in range(1, win_length - 1) for j in range(i + 2, win_length - 1)]
+
+
+def stack_threatening_point(old_threatening_point, threatening_point):
+    '''
+    Điểm hăm dọa mới của một vị trí khi có thêm một mẫu hăm dọa dồn vào nó\n
+    có 2 trường hợp, điểm hăm dọa của nó là 3, 4,.., hoặc 3.5, 4.5,...
+    Việc có nhiều hơn 2 cộng dồn hăm dọa của 3 cũng không thể làm đểm hăm dọa của nó thành 4 bởi vì 1 đường 4 vẫn hơn nhiều đường 3
+    '''
+    if old_threatening_point == 3 or old_threatening_point == 4:
+        return max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
+    old_threatening_point -= EXTRA_THREATENING_POINT
+    return max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
+
+
+def build_lines(size):
+    '''
+    Trả về danh sách tất cả các đường của bàn cờ size x size, mỗi đường là một tuple các tọa độ (x, y),
+    theo đúng thứ tự duyệt của threat_scores: các dòng, các cột, rồi lần lượt từng cặp đường chéo chính / đường chéo phụ từ dưới lên\n
+    Trả về thêm danh sách hướng của từng đường: 0 dòng, 1 cột, 2 chéo chính, 3 chéo phụ
+    '''
+    lines = [tuple((i, j) for j in range(size)) for i in range(size)]
+    lines += [tuple((i, j) for i in range(size)) for j in range(size)]
+    directions = [0] * size + [1] * size
+    for di in range(size - 1, -size, -1):
+        cells = range(max(0, di), min(size, di + size))
+        lines.append(tuple((i, i - di) for i in cells))
+        lines.append(tuple((i, size - 1 - (i - di)) for i in cells))
+        directions += [2, 3]
+    return lines, directions
+
+
+def build_pattern_table(opponent, win_length=WIN_LENGTH):
+    '''
+    Bảng tra cứu chuỗi cửa sổ -> (thứ tự mẫu, điểm hăm dọa, các vị trí N trong mẫu) cho các mẫu hăm dọa của opponent\n
+    Nhờ bảng này, một lần duyệt qua mỗi đường là tìm được tất cả các mẫu\n
+    Điểm hăm dọa không phụ thuộc win_length: đường 4 luôn có điểm 4, đường 3 điểm 3,...
+    '''
+    table = {}
+    for pattern_index, pattern in enumerate(get_threatening_patterns(opponent, win_length)):
+        table[pattern] = (pattern_index, pattern.count(opponent) - (win_length - 5), tuple(k for k, char in enumerate(pattern) if char == 'N'))
+    return table
+
+
+def build_windows(lines, lengths):
+    '''
+    Trả về danh sách tất cả các cửa sổ (thứ tự đường, vị trí bắt đầu, các tọa độ) có độ dài trong lengths trên các đường lines\n
+    và dict tọa độ (x, y) -> danh sách chỉ số các cửa sổ đi qua tọa độ đó
+    '''
+    windows = []
+    cell_windows = {}
+    for line_index, line in enumerate(lines):
+        for start in range(len(line)):
+            for length in lengths:
+                if start + length > len(line):
+                    break
+                cells = line[start:start+length]
+                for cell in cells:
+                    cell_windows.setdefault(cell, []).append(len(windows))
+                windows.append((line_index, start, cells))
+    return windows, cell_windows
+
+
+def build_zobrist_keys(size, seed=2024):
+    '''
+    Trả về các khóa Zobrist 64 bit ngẫu nhiên (cố định theo seed) cho mỗi quân X, O tại mỗi ô của bàn cờ size x size\n
+    và khóa dùng khi tới lượt O đi
+    '''
+    rng = random.Random(seed)
+    keys = {player: [[rng.getrandbits(64) for _ in range(size)] for _ in range(size)] for player in ('X', 'O')}
+    return keys, rng.getrandbits(64)
+
+
+class BoardGeometry:
+    """
+    Các bảng tính sẵn cho một kích thước bàn cờ và số quân liên tiếp để thắng:
+    các đường, các mẫu hăm dọa, các cửa sổ và khóa Zobrist\n
+    Mỗi cặp (size, win_length) chỉ được tính một lần, dùng get_geometry để lấy
+    """
+    def __init__(self, size, win_length):
+        if win_length < 5 or size < win_length + 2:
+            raise ValueError(f"Unsupported board: {size}x{size} with {win_length} in a row.")
+        self.size = size
+        self.win_length = win_length
+        # chỉ mục các đường của bàn cờ
+        self.lines, self.line_directions = build_lines(size)
+        self.pattern_tables = {'X': build_pattern_table('X', win_length), 'O': build_pattern_table('O', win_length)}
+        # độ dài các mẫu hăm dọa (win_length, win_length + 1, win_length + 2)
+        self.pattern_lengths = sorted({len(pattern) for pattern in self.pattern_tables['X']})
+        # các cửa sổ có thể chứa mẫu hăm dọa, dùng để cập nhật điểm hăm dọa sau mỗi nước đi
+        self.windows, self.cell_windows = build_windows(self.lines, self.pattern_lengths)
+        # 8 ô xung quanh mỗi ô, và bình phương khoảng cách tới tâm bàn cờ (tiêu chí phụ của get_lite_best_moves)
+        self.neighbours = {(x, y): tuple((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                                         if (dx, dy) != (0, 0) and 0 <= x + dx < size and 0 <= y + dy < size)
+                           for x in range(size) for y in range(size)}
+        center = size // 2
+        self.center_distance = {(x, y): (x - center) ** 2 + (y - center) ** 2 for x in range(size) for y in range(size)}
+        # GomokuPos dùng chung của mỗi ô, theo chỉ số x * size + y
+        self.positions = board_positions(size)
+        # bàn cờ mặc định giữ nguyên khóa cũ (opening book và position cache đã lưu theo các khóa đó),
+        # các bàn cờ khác dùng seed riêng để khóa của chúng không trùng nhau
+        seed = 2024 if (size, win_length) == (BOARD_SIZE, WIN_LENGTH) else f"{size}x{size}/{win_length}"
+        self.zobrist_keys, self.zobrist_side_key = build_zobrist_keys(size, seed)
+
+
+@lru_cache(maxsize=None)
+def get_geometry(size=BOARD_SIZE, win_length=WIN_LENGTH):
+    ''' BoardGeometry của bàn cờ size x size, thắng khi có win_length quân liên tiếp (chỉ được tạo 1 lần cho mỗi cặp) '''
+    return BoardGeometry(size, win_length)
+
+
+# 8 phép đối xứng của bàn cờ vuông (xoay, lật), mỗi phép là một số 0..7:
+# bit 4 đổi chỗ x và y (lật qua đường chéo chính), rồi bit 1 lật x, bit 2 lật y
+SYMMETRIES = range(8)
+
+
+def symmetric_pos(x, y, symmetry, inverse=False, size=BOARD_SIZE):
+    '''
+    Tọa độ của ô (x, y) của bàn cờ size x size sau phép đối xứng symmetry, inverse=True để thực hiện phép ngược lại
+    '''
+    if symmetry & 4 and not inverse:
+        x, y = y, x
+    if symmetry & 1:
+        x = size - 1 - x
+    if symmetry & 2:
+        y = size - 1 - y
+    if symmetry & 4 and inverse:
+        x, y = y, x
+    return x, y
+
+
+# Định dạng nhị phân của Gomoku.to_bytes: 1 byte phiên bản, 1 byte lượt đi, 1 byte kết quả (win()),
+# 2 byte nước đi cuối cùng (255 nếu chưa có), 1 byte kích thước bàn cờ, 1 byte số quân liên tiếp để thắng,
+# rồi bàn cờ với mỗi ô 2 bit (N = 0, X = 1, O = 2), 4 ô một byte\n
+# Phiên bản 1 (không có 2 byte kích thước, luôn là bàn cờ mặc định) vẫn đọc được
+BYTES_FORMAT_VERSION = 2
+BYTES_HEADER_SIZES = {1: 5, 2: 7}
+_CELL_CODES = {'N': 0, 'X': 1, 'O': 2}
+# bảng giải mã 1 byte -> 4 ô
+_BYTE_CELLS = [tuple('NXON'[(b >> shift) & 3] for shift in (0, 2, 4, 6)) for b in range(256)]
+# ngược lại: 4 ô liên tiếp -> byte (mã 3 không được dùng nên giữ byte nhỏ nhất của mỗi nhóm ô)
+_CELLS_BYTE = {}
+for _b, _cells in enumerate(_BYTE_CELLS):
+    _CELLS_BYTE.setdefault(_cells, _b)
+
+
 class GomokuPos:
-    '''Được thiết kế dành riêng cho lớp Gomoku'''
+    '''
+    Được thiết kế dành riêng cho lớp Gomoku\n
+    GomokuPos.at(x, y) trả về đối tượng dùng chung của ô (x, y) (không cấp phát mới, threatening luôn là 0),
+    được dùng cho các nước đi trong khi tìm kiếm. Không được thay đổi các đối tượng dùng chung này
+    '''
+    __slots__ = ('x', 'y', 'threatening')
+
     def __init__(self, x=-1, y=-1, threatening=0):
         self.x = x
         self.y = y
         self.threatening = threatening
 
+    @staticmethod
+    def at(x, y, size=BOARD_SIZE):
+        ''' GomokuPos dùng chung của ô (x, y) trên bàn cờ size x size '''
+        return board_positions(size)[x * size + y]
+
     def serialize(self):
         return json.dumps({'x': self.x, 'y': self.y, 'threatening': self.threatening})
 
@@ -21,8 +219,8 @@ class GomokuPos:
         data = json.loads(data)
         return cls(x=data['x'], y=data['y'], threatening=data['threatening'])
 
-    def valid_pos(self):
-        return 0 <= self.x < BOARD_SIZE and 0 <= self.y < BOARD_SIZE
+    def valid_pos(self, size=BOARD_SIZE):
+        return 0 <= self.x < size and 0 <= self.y < size
     
     @staticmethod
     def distance_between(pos_a, pos_b):
@@ -50,23 +248,87 @@ class GomokuPos:
         return hash((self.x, self.y))
 
 
+@lru_cache(maxsize=None)
+def board_positions(size):
+    ''' Các GomokuPos dùng chung của bàn cờ size x size, ô (x, y) ở chỉ số x * size + y '''
+    return tuple(GomokuPos(x, y) for x in range(size) for y in range(size))
+
+
+def threat_scores_from_hits(hits, positions, size):
+    '''
+    Gộp các lần khớp mẫu hăm dọa (khóa thứ tự duyệt, (x, y), điểm hăm dọa) thành kết quả của Gomoku.threat_scores:
+    danh sách (GomokuPos dùng chung, điểm hăm dọa) theo thứ tự tìm thấy lần đầu và điểm hăm dọa cao nhất\n
+    positions là board_positions(size)
+    '''
+    hits.sort()
+
+    # điểm hăm dọa của từng vị trí (x, y), theo thứ tự vị trí được tìm thấy lần đầu
+    threatening_points = {}
+    for _, pos, threatening_point in hits:
+        old_threatening_point = threatening_points.get(pos)
+        # nếu vị trí hăm dọa tìm được là mới và chưa tồn tại từ trước tới giờ
+        if old_threatening_point is None:
+            threatening_points[pos] = threatening_point
+        # điểm hăm dọa của vị trí được cộng dồn sẽ tăng
+        else:
+            threatening_points[pos] = stack_threatening_point(old_threatening_point, threatening_point)
+
+    if not threatening_points:
+        return [], 0
+
+    scores = [(positions[x * size + y], threatening_point) for (x, y), threatening_point in threatening_points.items()]
+    return scores, max(threatening_points.values())
+
 
 class Gomoku:
     """
     Bàn cờ Caro với 2 người chơi\n
     Tọa độ của bàn cờ được quy định giống như một ma trận cấp 2 với các cột(dòng) 0 -> N từ trên xuống dưới(từ trái qua phải)\n
     Sử dụng lớp GomokuPos\n
-    Mặc định nước đi đầu tiên là X
+    Mặc định nước đi đầu tiên là X\n
+    Bàn cờ có size x size ô, thắng khi có win_length quân liên tiếp (bản sao từ other giữ nguyên kích thước của other)
     """
-    def __init__(self, other=None):
+    def __init__(self, other=None, size=BOARD_SIZE, win_length=WIN_LENGTH):
+        # các bảng tính sẵn của kích thước bàn cờ này, dùng chung cho mọi bàn cờ cùng kích thước
+        self.geometry = other.geometry if other is not None else get_geometry(size, win_length)
         if other is None:
             # Một vị trí trong board có thể có 3 giá trị X, O hoặc N (vị trí chưa có nước đi)
-            self.board = [['N' for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
+            self.board = [['N' for _ in range(size)] for _ in range(size)]
             # active turn là nước đi tiếp theo của bàn cờ, mặc định nước đi đầu tiên là X
             self.active_turn = 'X'
+            # nước đi cuối cùng và số quân đã đặt, dùng cho win(last_move_only=True)
+            self.last_move = None
+            self.stone_count = 0
+            # các nước đã đi (theo thứ tự), dùng cho undo_move
+            self.move_stack = []
+            # khóa Zobrist của bàn cờ, được cập nhật sau mỗi move/undo_move
+            self.zobrist_key = 0
         else:
             self.board = [row[:] for row in other.board]
             self.active_turn = other.active_turn
+            self.last_move = other.last_move
+            self.stone_count = other.stone_count
+            self.move_stack = other.move_stack[:]
+            self.zobrist_key = other.zobrist_key
+        # neighbour_counts[player]: ô (x, y) -> số quân của player ở 8 ô xung quanh (chỉ các ô có ít nhất 1 quân),
+        # được cập nhật sau mỗi move/undo_move để get_lite_best_moves chỉ cần duyệt các ô cạnh quân đã đi
+        if other is not None and getattr(other, 'neighbour_counts', None) is not None:
+            self.neighbour_counts = {player: dict(counts) for player, counts in other.neighbour_counts.items()}
+        else:
+            self.count_neighbours()
+        # điểm hăm dọa được cập nhật theo từng nước đi, xem enable_threat_tracking
+        self.threat_hits = None
+        self.window_hits = None
+        if other is not None and getattr(other, 'threat_hits', None) is not None:
+            self.enable_threat_tracking()
+
+    @property
+    def size(self):
+        return self.geometry.size
+
+    @property
+    def win_length(self):
+        return self.geometry.win_length
     
     # Use for Streamlit Web Application
     def serialize(self):
@@ -74,72 +336,190 @@ class Gomoku:
         return json.dumps({
             'board': self.board,
             'active_turn': self.active_turn,
+            'win_length': self.win_length,
         })
 
     @classmethod
     def deserialize(cls, json_str):
         """Create an object instance from a JSON string."""
         data = json.loads(json_str)
-        instance = cls()
+        instance = cls(size=len(data['board']), win_length=data.get('win_length', WIN_LENGTH))
         instance.board = data['board']
         instance.active_turn = data['active_turn']
+        instance.stone_count = sum(cell != 'N' for row in instance.board for cell in row)
+        instance.zobrist_key = instance.compute_zobrist_key()
+        instance.count_neighbours()
+        return instance
+
+    def to_bytes(self, status=None):
+        '''
+        Mã hóa bàn cờ thành chuỗi byte gọn (khoảng 100 byte thay vì vài KB JSON), xem BYTES_FORMAT_VERSION\n
+        Kết quả win() được lưu kèm để Gomoku.peek_status đọc được mà không cần giải mã bàn cờ,
+        truyền status nếu đã biết kết quả để khỏi phải tính lại
+        '''
+        if status is None:
+            status = self.win()
+        cells = list(chain.from_iterable(self.board))
+        cells += ['N'] * (-len(cells) % 4)
+        # zip của cùng một iterator cắt cells thành từng nhóm 4 ô, map và bytes chạy hoàn toàn trong C
+        cell_iter = iter(cells)
+        packed = bytes(map(_CELLS_BYTE.__getitem__, zip(cell_iter, cell_iter, cell_iter, cell_iter)))
+        last_x, last_y = (255, 255) if self.last_move is None else (self.last_move.x, self.last_move.y)
+        header = bytes((BYTES_FORMAT_VERSION, _CELL_CODES[self.active_turn], ord(status), last_x, last_y, self.size, self.win_length))
+        return header + packed
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Create an object instance from the output of to_bytes."""
+        data = memoryview(data)
+        header_size = BYTES_HEADER_SIZES.get(data[0])
+        if header_size is None:
+            raise ValueError(f"Unsupported Gomoku bytes format: {data[0]}")
+        size, win_length = (data[5], data[6]) if data[0] >= 2 else (BOARD_SIZE, WIN_LENGTH)
+        # vòng lặp theo từng byte, mỗi byte được tra bảng thành 4 ô (đo được nhanh hơn list(chain.from_iterable(map(...))))
+        cells = []
+        for b in data[header_size:]:
+            cells.extend(_BYTE_CELLS[b])
+        # bỏ các ô thêm vào cho đủ byte cuối cùng
+        del cells[size * size:]
+        instance = cls(size=size, win_length=win_length)
+        instance.board = [cells[i*size:(i+1)*size] for i in range(size)]
+        instance.active_turn = 'X' if data[1] == _CELL_CODES['X'] else 'O'
+        if data[3] != 255:
+            instance.last_move = GomokuPos.at(data[3], data[4], size)
+        instance.stone_count = size * size - cells.count('N')
+        instance.zobrist_key = instance.compute_zobrist_key()
+        instance.count_neighbours()
         return instance
+
+    @staticmethod
+    def peek_status(data):
+        ''' Trả về kết quả ('X', 'O', 'T' hoặc 'N') đã lưu trong chuỗi byte của to_bytes, không cần giải mã bàn cờ '''
+        return chr(data[2])
+
+    def compute_zobrist_key(self):
+        ''' Tính khóa Zobrist của bàn cờ từ đầu (bình thường khóa được cập nhật dần trong move/undo_move) '''
+        zobrist_keys = self.geometry.zobrist_keys
+        key = self.geometry.zobrist_side_key if self.active_turn == 'O' else 0
+        for i, row in enumerate(self.board):
+            for j, cell in enumerate(row):
+                if cell != 'N':
+                    key ^= zobrist_keys[cell][i][j]
+        return key
+
+    def count_neighbours(self):
+        ''' Tính neighbour_counts từ đầu (bình thường được cập nhật dần trong move/undo_move) '''
+        self.neighbour_counts = {'X': {}, 'O': {}}
+        neighbours = self.geometry.neighbours
+        for i, row in enumerate(self.board):
+            for j, cell in enumerate(row):
+                if cell != 'N':
+                    counts = self.neighbour_counts[cell]
+                    for neighbour in neighbours[(i, j)]:
+                        counts[neighbour] = counts.get(neighbour, 0) + 1
+
+    def canonical_key(self):
+        '''
+        Khóa Zobrist chung cho cả 8 bàn cờ đối xứng với bàn cờ hiện tại (khóa nhỏ nhất trong 8 khóa)\n
+        Trả về (khóa, phép đối xứng đưa bàn cờ hiện tại về bàn cờ có khóa đó)
+        '''
+        stones = [(cell, i, j) for i, row in enumerate(self.board) for j, cell in enumerate(row) if cell != 'N']
+        geometry = self.geometry
+        side_key = geometry.zobrist_side_key if self.active_turn == 'O' else 0
+        best = None
+        for symmetry in SYMMETRIES:
+            key = side_key
+            for cell, i, j in stones:
+                x, y = symmetric_pos(i, j, symmetry, size=geometry.size)
+                key ^= geometry.zobrist_keys[cell][x][y]
+            if best is None or key < best[0]:
+                best = (key, symmetry)
+        return best
     
         
-    def win(self):
+    def win(self, last_move_only=False):
         """
         Check if there's a winner or if the game is tied.\n
+        With last_move_only=True only the four lines through the last placed stone are checked,
+        which gives the same result as the full scan as long as the game was not already over before that move.\n
         Returns:
             'X' or 'O' if a player has won\n
             'T' if the game is tied\n
             'N' if the game is ongoing\n
         """
+        if last_move_only and self.last_move is not None:
+            return self._win_at(self.last_move)
+
+        size, win_length = self.geometry.size, self.geometry.win_length
+
         def check_sequence(seq):
-            """ Helper function to check for a sequence of five identical pieces. """
-            for i in range(len(seq) - 4):
-                if seq[i:i+5] == ['X'] * 5:
+            """ Helper function to check for a sequence of win_length identical pieces. """
+            for i in range(len(seq) - win_length + 1):
+                if seq[i:i+win_length] == ['X'] * win_length:
                     return 'X'
-                elif seq[i:i+5] == ['O'] * 5:
+                elif seq[i:i+win_length] == ['O'] * win_length:
                     return 'O'
             return None
 
         # Check rows and columns
-        for i in range(BOARD_SIZE):
+        for i in range(size):
             # Check rows
             row_winner = check_sequence(self.board[i])
             if row_winner:
                 return row_winner
             
             # Check columns
-            column = [self.board[j][i] for j in range(BOARD_SIZE)]
+            column = [self.board[j][i] for j in range(size)]
             column_winner = check_sequence(column)
             if column_winner:
                 return column_winner
 
         # Check diagonals
-        for i in range(BOARD_SIZE - 4):
-            for j in range(BOARD_SIZE):
+        for i in range(size - win_length + 1):
+            for j in range(size):
                 # Main diagonal (top-left to bottom-right)
-                if j <= BOARD_SIZE - 5:
-                    diag1 = [self.board[i+k][j+k] for k in range(5)]
+                if j <= size - win_length:
+                    diag1 = [self.board[i+k][j+k] for k in range(win_length)]
                     diag1_winner = check_sequence(diag1)
                     if diag1_winner:
                         return diag1_winner
                 
                 # Anti-diagonal (top-right to bottom-left)
-                if j >= 4:
-                    diag2 = [self.board[i+k][j-k] for k in range(5)]
+                if j >= win_length - 1:
+                    diag2 = [self.board[i+k][j-k] for k in range(win_length)]
                     diag2_winner = check_sequence(diag2)
                     if diag2_winner:
                         return diag2_winner
 
         # Check for tie
-        if all(cell != 'N' for row in self.board for cell in row):
+        if self.stone_count == size * size:
             return 'T'
 
         # No winner yet
         return 'N'
 
+    def _win_at(self, pos):
+        ''' Chỉ kiểm tra 4 đường (ngang, dọc, 2 đường chéo) đi qua pos '''
+        x, y = pos.x, pos.y
+        size = self.geometry.size
+        stone = self.board[x][y]
+        if stone != 'N':
+            for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                count = 1
+                # đếm số quân liên tiếp giống stone theo cả 2 chiều của đường
+                for sign in (1, -1):
+                    i, j = x + sign * dx, y + sign * dy
+                    while 0 <= i < size and 0 <= j < size and self.board[i][j] == stone:
+                        count += 1
+                        i += sign * dx
+                        j += sign * dy
+                if count >= self.geometry.win_length:
+                    return stone
+
+        if self.stone_count == size * size:
+            return 'T'
+        return 'N'
+
     def over(self):
         """ Check if the game is over (win or tie). """
         return self.win() != 'N'
@@ -148,177 +528,234 @@ class Gomoku:
         """ Place the stone of the active player at the specified position. """
         if self.board[pos.x][pos.y] == 'N':
             self.board[pos.x][pos.y] = self.active_turn
+            self.last_move = pos
+            self.stone_count += 1
+            self.move_stack.append(pos)
+            self.zobrist_key ^= self.geometry.zobrist_keys[self.active_turn][pos.x][pos.y] ^ self.geometry.zobrist_side_key
+            counts = self.neighbour_counts[self.active_turn]
+            for neighbour in self.geometry.neighbours[(pos.x, pos.y)]:
+                counts[neighbour] = counts.get(neighbour, 0) + 1
+            if self.threat_hits is not None:
+                self._rescore_windows(pos.x, pos.y)
             # Toggle active player
             self.active_turn = 'O' if self.active_turn == 'X' else 'X'
         else:
             raise ValueError("Invalid move: position already occupied or out of bounds.")
+
+    def undo_move(self):
+        """ Take back the last move made with move(). """
+        if not self.move_stack:
+            raise ValueError("Invalid undo: no move to take back.")
+        pos = self.move_stack.pop()
+        stone = self.board[pos.x][pos.y]
+        self.zobrist_key ^= self.geometry.zobrist_keys[stone][pos.x][pos.y] ^ self.geometry.zobrist_side_key
+        counts = self.neighbour_counts[stone]
+        for neighbour in self.geometry.neighbours[(pos.x, pos.y)]:
+            if counts[neighbour] == 1:
+                del counts[neighbour]
+            else:
+                counts[neighbour] -= 1
+        self.board[pos.x][pos.y] = 'N'
+        if self.threat_hits is not None:
+            self._rescore_windows(pos.x, pos.y)
+        self.stone_count -= 1
+        self.last_move = self.move_stack[-1] if self.move_stack else None
+        self.active_turn = 'O' if self.active_turn == 'X' else 'X'
+
+    def enable_threat_tracking(self):
+        '''
+        Bật chế độ lưu các mẫu hăm dọa của cả 2 bên và cập nhật chúng sau mỗi move/undo_move\n
+        Mỗi nước đi chỉ làm thay đổi các cửa sổ đi qua ô vừa đi, nên chỉ những cửa sổ đó được tính lại
+        '''
+        # threat_hits[opponent]: (x, y) -> {khóa thứ tự duyệt: điểm hăm dọa} của các mẫu hăm dọa của opponent có ô trống tại (x, y)
+        # window_hits[opponent]: chỉ số cửa sổ -> các (khóa, (x, y)) mà cửa sổ đó đang đóng góp
+        self.threat_hits = {'X': {}, 'O': {}}
+        self.window_hits = {'X': {}, 'O': {}}
+        for window_id in range(len(self.geometry.windows)):
+            self._rescore_window(window_id)
+
+    def _rescore_windows(self, x, y):
+        ''' Tính lại các cửa sổ đi qua ô (x, y) '''
+        for window_id in self.geometry.cell_windows[(x, y)]:
+            self._rescore_window(window_id)
+
+    def _rescore_window(self, window_id):
+        line_index, start, cells = self.geometry.windows[window_id]
+        pattern_tables = self.geometry.pattern_tables
+        board = self.board
+        window_string = ''.join([board[x][y] for x, y in cells])
+        for opponent in ('X', 'O'):
+            cell_hits = self.threat_hits[opponent]
+            window_hits = self.window_hits[opponent]
+            # bỏ các mẫu cũ mà cửa sổ này đã đóng góp
+            old_hits = window_hits.pop(window_id, None)
+            if old_hits is not None:
+                for key, cell in old_hits:
+                    hits = cell_hits[cell]
+                    del hits[key]
+                    if not hits:
+                        del cell_hits[cell]
+            match = pattern_tables[opponent].get(window_string)
+            if match is not None:
+                pattern_index, threatening_point, empty_offsets = match
+                new_hits = []
+                for k in empty_offsets:
+                    key = (pattern_index, line_index, start, k)
+                    cell_hits.setdefault(cells[k], {})[key] = threatening_point
+                    new_hits.append((key, cells[k]))
+                window_hits[window_id] = new_hits
     
     def have_occupied(self, pos):
         ''' Trả về True nếu vị trí hiện tại bị chiếm bởi X hoặc O'''
         return self.board[pos.x][pos.y] != 'N'
 
+    def cell(self, x, y):
+        ''' Giá trị của ô (x, y): 'X', 'O' hoặc 'N' '''
+        return self.board[x][y]
+
     
     def get_new_state(self, pos):
         ''' Trả về một Gomoku mới là trạng thái của bàn cờ sau khi di chuyển nước đi pos'''
-        new_state = Gomoku(self)
+        new_state = type(self)(self)
         new_state.move(pos)
         return new_state
     
     def get_threatening_positions(self, opponent):
         '''
         Trả về một danh sách các GomokuPos là các vị trí mà opponent khả năng cao sẽ đi nhất (những vị trí mà opponent tạo được nhiều điểm hăm dọa nhất)\n
-        Và điểm hăm dọa cao nhất
+        Và điểm hăm dọa cao nhất\n
+        Mỗi GomokuPos là một đối tượng mới có threatening là điểm hăm dọa, khi tìm kiếm nên dùng threat_scores
         '''
-        # me là nước đi có vai trò chặn opponent
-        me = 'X' if opponent == 'O' else 'O'
+        scores, max_threatening_point = self.threat_scores(opponent)
+        return [GomokuPos(pos.x, pos.y, threatening_point) for pos, threatening_point in scores], max_threatening_point
 
-        # Danh sách những mẫu/chuỗi trường hợp hăm dọa thường thấy
-        # Ví dụ "{1}{0}{0}{0}{0}N".format(opponent, me)
-        # Chuỗi này có nghĩa là opponent đã đi được 4 nước liên tiếp, bị chặn 1 đầu và đầu còn lại chưa được đi
-        threatening_patterns = ["{1}{0}{0}{0}{0}N".format(opponent, me), "N{0}{0}{0}{0}{1}".format(opponent, me), "{0}{0}{0}{0}N".format(opponent, me), "N{0}{0}{0}{0}".format(opponent, me), "{0}{0}{0}N{0}".format(opponent), "{0}N{0}{0}{0}".format(opponent), "{0}{0}N{0}{0}".format(opponent), \
-                    "N{0}N{0}{0}N".format(opponent), "N{0}{0}N{0}N".format(opponent), "N{0}{0}{0}N".format(opponent), "{1}N{0}{0}{0}NN".format(opponent, me), "NN{0}{0}{0}N{1}".format(opponent, me), "{1}{0}{0}{0}NN".format(opponent, me), "NN{0}{0}{0}{1}".format(opponent, me), "{0}N{0}N{0}".format(opponent),\
-                        "N{0}{0}NN".format(opponent), "NN{0}{0}N".format(opponent), "N{0}N{0}N".format(opponent)]
-        
-        # điểm hăm dọa dùng cộng thêm nếu như xuất hiện 2 hay nhiều nước hăm dọa được dồn vào cùng 1 vị trí
-        EXTRA_THREATENING_POINT = 0.5
-
-        # danh sách kết quả các nước hăm dọa
-        threatening_positions = []
-
-        for pattern in threatening_patterns: # với mỗi mẫu hăm dọa, bảng sẽ được duyệt toàn bộ 1 lần
-            # điểm hăm dọa của mẫu sẽ được gán cho vị trí hăm dọa (nếu có tồn tại)
-            threatening_point = pattern.count('{0}'.format(opponent)) 
-
-            for i, row in enumerate(self.board):  # duyệt từng dòng
-                # tại dòng được xét, duyệt từ trái qua phải xem có tồn tại mẫu hăm dọa trong đó hay không
-                for j in range(BOARD_SIZE - len(pattern) + 1):
-                    if ''.join(row[j:j+len(pattern)]) == pattern: # nếu có chuỗi hăm dọa tại vị trí j
-                        # tạo một biến k để tìm vị trí chưa đánh trong phạm vi chuỗi hăm dọa tìm được (đó cũng chính là vị trí hăm dọa)
-                        for k, char in enumerate(pattern):
-                            # có 2 trường hợp, điểm hăm dọa của nó là 3, 4,.., hoặc 3.5, 4.5,... 
-                            # Việc có nhiều hơn 2 cộng dồn hăm dọa của 3 cũng không thể làm đểm hăm dọa của nó thành 4 bởi vì 1 đường 4 vẫn hơn nhiều đường 3
-                            if char == 'N' and 0 <= j+k < BOARD_SIZE:
-                                pos = GomokuPos(i, j+k)
-                                # nếu vị trí hăm dọa tìm được là mới và chưa tồn tại từ trước tới giờ
-                                if pos not in threatening_positions:
-                                    pos.threatening = threatening_point
-                                    threatening_positions.append(pos)
-                                # điểm hăm dọa của vị trí được cộng dồn sẽ tăng
-                                else: 
-                                    id = threatening_positions.index(pos)
-                                    old_threatening_point = threatening_positions[id].threatening
-                                    if old_threatening_point == 3 or old_threatening_point == 4:
-                                        threatening_positions[id].threatening = max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
-                                    else:
-                                        old_threatening_point -= EXTRA_THREATENING_POINT
-                                        threatening_positions[id].threatening = max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
-            for j in range(BOARD_SIZE): # duyệt theo cột. Cách duyệt của nó cũng tương tự với duyệt theo dòng
-                for i in range(BOARD_SIZE - len(pattern) + 1):
-                    if ''.join(self.board[i+k][j] for k in range(len(pattern))) == pattern:
-                        for k, char in enumerate(pattern):
-                            if char == 'N' and 0 <= i+k < BOARD_SIZE:
-                                pos = GomokuPos(i+k, j)
-                                if pos not in threatening_positions:
-                                    pos.threatening = threatening_point
-                                    threatening_positions.append(pos)
-                                else: 
-                                    id = threatening_positions.index(pos)
-                                    old_threatening_point = threatening_positions[id].threatening
-                                    if old_threatening_point == 3 or old_threatening_point == 4:
-                                        threatening_positions[id].threatening = max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
-                                    else:
-                                        old_threatening_point -= EXTRA_THREATENING_POINT
-                                        threatening_positions[id].threatening = max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
-            # duyệt đường chéo chính và đường chéo phụ
-            # Ví dụ nếu BOARD_SIZE là 5 ta sẽ cho di chạy đoạn [4,-4] tương ứng có 9 CẶP đường chéo chính đường chéo phụ
-            # di là biến chạy dùng để lặp qua 9 cặp này, tương ứng với duyệt lần lượt toàn bộ đường chéo từ dưới lên
-            for di in range(BOARD_SIZE-1, -BOARD_SIZE, -1): 
-                # 2 danh sách các tọa độ của đường chéo chính và đường chéo phụ đang được xét
-                major_diagonal = [(i, i - di) for i in range(max(0, di), min(BOARD_SIZE, di + BOARD_SIZE))]
-                minor_diagonal = [(i, BOARD_SIZE - 1 - (i - di)) for i in range(max(0, di), min(BOARD_SIZE, di + BOARD_SIZE))]
-                for diagonal in [major_diagonal, minor_diagonal]:
-                    # kiểm tra xem đường chéo được xét có chứa đe dọa hay không
-                    # nếu có thì biến i sẽ là tọa độ bắt đầu của nó
-                    for i in range(len(diagonal) - len(pattern) + 1): 
-                        # nếu tại vị trí i của đường chéo xuất hiện mẫu hăm dọa
-                        if ''.join(self.board[x][y] for x, y in diagonal[i:i+len(pattern)]) == pattern:
-                            for k, char in enumerate(pattern):
-                                if char == 'N':
-                                    x, y = diagonal[i+k] # lấy tọa độ của điểm hăm dọa (là điểm N, chưa được đánh)
-                                    pos = GomokuPos(x, y)
-                                    if pos not in threatening_positions:
-                                        pos.threatening = threatening_point
-                                        threatening_positions.append(pos)
-                                    else:
-                                        id = threatening_positions.index(pos)
-                                        old_threatening_point = threatening_positions[id].threatening
-                                        if old_threatening_point == 3 or old_threatening_point == 4:
-                                            threatening_positions[id].threatening = max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
-                                        else:
-                                            old_threatening_point -= EXTRA_THREATENING_POINT
-                                            threatening_positions[id].threatening = max(old_threatening_point, threatening_point) + EXTRA_THREATENING_POINT
-
-        if not threatening_positions:
+    def threat_scores(self, opponent):
+        '''
+        Giống get_threatening_positions nhưng trả về danh sách (GomokuPos dùng chung, điểm hăm dọa) (cùng thứ tự) và điểm hăm dọa cao nhất,
+        không cấp phát GomokuPos mới
+        '''
+        if self.threat_hits is not None:
+            return self._tracked_threat_scores(opponent)
+
+        geometry = self.geometry
+        pattern_table = geometry.pattern_tables[opponent]
+        pattern_lengths = geometry.pattern_lengths
+        min_length = pattern_lengths[0]
+
+        # duyệt mỗi đường đúng 1 lần, tại mỗi vị trí tra bảng để tìm mẫu hăm dọa (nếu có) với mọi độ dài
+        # mỗi lần khớp được ghi lại cùng khóa (thứ tự mẫu, thứ tự đường, vị trí bắt đầu, vị trí N) để giữ đúng thứ tự duyệt từng mẫu một
+        hits = []
+        board = self.board
+        for line_index, line in enumerate(geometry.lines):
+            line_string = ''.join([board[x][y] for x, y in line])
+            # mẫu nào cũng có ít nhất 2 quân của opponent
+            if line_string.count(opponent) < 2:
+                continue
+            line_length = len(line_string)
+            for i in range(line_length - min_length + 1):
+                for length in pattern_lengths:
+                    if i + length > line_length:
+                        break
+                    match = pattern_table.get(line_string[i:i+length])
+                    if match is not None:
+                        pattern_index, threatening_point, empty_offsets = match
+                        for k in empty_offsets:
+                            hits.append(((pattern_index, line_index, i, k), line[i+k], threatening_point))
+        return threat_scores_from_hits(hits, geometry.positions, geometry.size)
+
+    def _tracked_threat_scores(self, opponent):
+        ''' Giống threat_scores nhưng đọc từ các mẫu hăm dọa đã được lưu bởi enable_threat_tracking '''
+        cell_hits = self.threat_hits[opponent]
+        if not cell_hits:
             return [], 0
-        
-        max_threatening_point = max(pos.threatening for pos in threatening_positions)
-        return threatening_positions, max_threatening_point
 
-    def get_best_moves(self):
+        positions, size = self.geometry.positions, self.geometry.size
+        scores = []
+        max_threatening_point = 0
+        # các vị trí được sắp theo thứ tự tìm thấy lần đầu khi duyệt toàn bộ bàn cờ
+        for (x, y), hits in sorted(cell_hits.items(), key=lambda item: min(item[1])):
+            threatening_point = None
+            for key in sorted(hits):
+                if threatening_point is None:
+                    threatening_point = hits[key]
+                else:
+                    threatening_point = stack_threatening_point(threatening_point, hits[key])
+            scores.append((positions[x * size + y], threatening_point))
+            max_threatening_point = max(max_threatening_point, threatening_point)
+        return scores, max_threatening_point
+
+    def get_best_moves(self, rng=random):
         '''
-        Trả về các nước nên đi nhất hiện tại dựa trên hàm get_threatening_positions
+        Trả về các nước nên đi nhất hiện tại (các GomokuPos dùng chung) dựa trên hàm threat_scores\n
+        rng dùng để chọn ngẫu nhiên khi không có nước hăm dọa (truyền random.Random(seed) để có kết quả lặp lại được)
         '''
         me = self.active_turn
         op = 'X' if me == 'O' else 'O'
         # tìm nước đi tốt nhất của 2 bên
-        op_threatening_moves, op_threatening_point = self.get_threatening_positions(op) # defense moves
-        me_threatening_moves, me_threatening_point = self.get_threatening_positions(me) # attack moves
+        op_threatening_moves, op_threatening_point = self.threat_scores(op) # defense moves
+        me_threatening_moves, me_threatening_point = self.threat_scores(me) # attack moves
         # sau khi có nước đi tốt nhất của 2 bên, cần quyết định xem nên tấn công hay phòng thủ 
         # người chơi me sẽ chỉ phòng thủ nếu như nước đi của địch nhiều hăm dọa hơn
         if me_threatening_point >= op_threatening_point:
             # look if the player me has any attack moves
             if me_threatening_moves: 
-                return [move for move in me_threatening_moves if move.threatening == me_threatening_point], me_threatening_point
-            return [random.choice(self.get_lite_best_moves(me))], me_threatening_point
+                return [move for move, point in me_threatening_moves if point == me_threatening_point], me_threatening_point
+            return [rng.choice(self.get_lite_best_moves(me))], me_threatening_point
         elif op_threatening_point >= 4:
             # only need to return one move because that move is eventually played
-            return [[move for move in op_threatening_moves if move.threatening == op_threatening_point][0]], op_threatening_point
-        return [move for move in op_threatening_moves if move.threatening == op_threatening_point], op_threatening_point
+            return [[move for move, point in op_threatening_moves if point == op_threatening_point][0]], op_threatening_point
+        return [move for move, point in op_threatening_moves if point == op_threatening_point], op_threatening_point
+
+    def evaluate_moves(self, moves):
+        '''
+        Đánh giá một loạt nước đi của người chơi hiện tại trong 1 lần gọi\n
+        Trả về danh sách (winner, me_point, op_point) theo thứ tự của moves, trong đó sau khi đi nước đó:
+        winner là kết quả của win(last_move_only=True), me_point / op_point là điểm hăm dọa cao nhất
+        của người vừa đi / của đối thủ (người sẽ đi tiếp)\n
+        Bàn cờ không bị thay đổi sau khi gọi hàm này
+        '''
+        me = self.active_turn
+        op = 'X' if me == 'O' else 'O'
+        evaluations = []
+        for move in moves:
+            self.move(move)
+            evaluations.append((self.win(last_move_only=True),
+                                self.threat_scores(me)[1], self.threat_scores(op)[1]))
+            self.undo_move()
+        return evaluations
 
     def get_lite_best_moves(self, me):
         '''
         Return lite-best moves of the me player\n
-        Nước đi được đánh giá tốt hơn nếu như có nhiều nước giống nó hơn
+        Nước đi được đánh giá tốt hơn nếu như có nhiều nước giống nó hơn\n
+        Chỉ các ô cạnh quân của me (neighbour_counts) được duyệt, kết quả giống như khi duyệt cả bàn cờ theo thứ tự dòng
         '''
-        best_moves = []
-        max_allies = -1
         MOVE_LIMITED = 4
-        # tìm 8 hướng xung quanh để đếm số lượng nước giống
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]
-        for i in range(BOARD_SIZE):
-            for j in range(BOARD_SIZE):
-                if self.board[i][j] == 'N':
-                    num_allies = 0
-                    for dx, dy in directions:
-                        x, y = i + dx, j + dy
-                        if 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE and self.board[x][y] == me:
-                            num_allies += 1
-                    if num_allies > max_allies:
-                        best_moves.clear()
-                        best_moves.append(GomokuPos(i, j))
-                        max_allies = num_allies
-                    elif num_allies == max_allies:
-                        best_moves.append(GomokuPos(i, j))
-        
-        if len(best_moves) < MOVE_LIMITED:
-            return best_moves
+        board = self.board
+        best_moves = []
+        max_allies = 0
+        for (x, y), num_allies in self.neighbour_counts[me].items():
+            if board[x][y] == 'N':
+                if num_allies > max_allies:
+                    best_moves = [(x, y)]
+                    max_allies = num_allies
+                elif num_allies == max_allies:
+                    best_moves.append((x, y))
+        if best_moves:
+            best_moves.sort()
         else:
+            # không có ô trống nào cạnh quân của me: mọi ô trống đều như nhau
+            size = self.geometry.size
+            best_moves = [(i, j) for i in range(size) for j in range(size) if board[i][j] == 'N']
+
+        if len(best_moves) >= MOVE_LIMITED:
             '''
-            Lọc tiêu chí phụ, ví dụ ở đây là gần trung tâm hơn
+            Lọc tiêu chí phụ, ví dụ ở đây là gần trung tâm hơn (sắp xếp ổn định nên các ô bằng nhau vẫn theo thứ tự dòng)
             '''
-            center_point = GomokuPos(BOARD_SIZE//2, BOARD_SIZE//2)
-            best_moves.sort(key=lambda x: GomokuPos.distance_between(center_point, x))
-            return best_moves[0:MOVE_LIMITED]
+            best_moves.sort(key=self.geometry.center_distance.__getitem__)
+            best_moves = best_moves[0:MOVE_LIMITED]
+        positions, size = self.geometry.positions, self.geometry.size
+        return [positions[x * size + y] for x, y in best_moves]
 
     def count_moves(self):
         '''
@@ -338,7 +775,7 @@ class Gomoku:
     def show_board(self):
         """ Display the current game board. """
         print("   ", end="")
-        for i in range(BOARD_SIZE):
+        for i in range(self.geometry.size):
             print(f"{i%10}", end=" ")
         print()
         j = 0
@@ -349,14 +786,201 @@ class Gomoku:
         print()
 
 
+class SearchAborted(Exception):
+    ''' Được ném ra khi GomokuBot hết thời gian hoặc số trạng thái cho phép '''
+
+
+class TranspositionTable:
+    """
+    Bảng lưu kết quả tìm kiếm của GomokuBot theo khóa Zobrist của bàn cờ\n
+    Bảng có số ô cố định (tính từ max_megabytes), mỗi khóa chỉ có 1 ô = khóa % số ô.
+    Khi 2 khóa tranh nhau 1 ô, kết quả được tìm sâu hơn hoặc của lần tìm kiếm mới hơn sẽ được giữ lại\n
+    Điểm được lưu theo góc nhìn của bên tới lượt đi nên có thể dùng chung cho cả 2 bên
+    """
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+    # ước lượng bộ nhớ cho 1 kết quả (tuple, khóa 64 bit và con trỏ của ô)
+    ENTRY_BYTES = 160
+
+    def __init__(self, max_megabytes=16):
+        self.size = max(1, int(max_megabytes * 1024 * 1024) // self.ENTRY_BYTES)
+        self.entries = [None] * self.size
+        # mỗi lần tìm kiếm mới tăng generation, kết quả cũ sẽ bị thay thế trước
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        ''' Trả về (độ sâu còn lại, điểm, loại điểm, nước đi tốt nhất) đã lưu của key, hoặc None '''
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        self.misses += 1
+        return None
+
+    def store(self, key, draft, score, flag, best_move):
+        index = key % self.size
+        old = self.entries[index]
+        if old is not None and old[0] != key:
+            # chỉ thay thế kết quả của khóa khác nếu nó cũ hơn hoặc được tìm nông hơn
+            if old[5] == self.generation and old[1] > draft:
+                return
+            self.replacements += 1
+        self.entries[index] = (key, draft, score, flag, best_move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.hits = self.misses = self.stores = self.replacements = 0
+
+    def stats(self):
+        ''' Các bộ đếm dùng để chọn kích thước bảng '''
+        probes = self.hits + self.misses
+        return {
+            'size': self.size,
+            'used': sum(entry is not None for entry in self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / probes if probes else 0.0,
+            'stores': self.stores,
+            'replacements': self.replacements,
+        }
+
+
+class SearchStats:
+    """
+    Thống kê của một lần tìm kiếm của GomokuBot (xem GomokuBot.stats)\n
+    timings chỉ được đo khi bot được tạo với profile=True
+    """
+    def __init__(self):
+        self.nodes = 0
+        # số trạng thái đã duyệt ở mỗi độ sâu (của lần tìm kiếm sâu dần cuối cùng) và số lần cắt tỉa alpha-beta ở mỗi độ sâu
+        self.nodes_by_depth = {}
+        self.cutoffs_by_depth = {}
+        # số lần cắt tỉa bởi nước đi đầu tiên được thử (thứ tự nước đi càng tốt thì tỉ lệ này càng cao)
+        self.first_move_cutoffs = 0
+        # số lần tìm lại của PVS (cửa sổ rỗng bị vượt qua) và của aspiration window (điểm nằm ngoài cửa sổ)
+        self.pvs_researches = 0
+        self.aspiration_researches = 0
+        # độ sâu của lần tìm kiếm hoàn chỉnh sâu nhất
+        self.depth = 0
+        self.elapsed = 0.0
+        self.tt_hits = 0
+        self.tt_misses = 0
+        # nguồn của nước đi: 'search', 'book' (opening book), 'cache' (bộ nhớ đệm trên đĩa) hoặc 'threat_search'
+        self.source = 'search'
+        # thời gian (giây) trong các hàm tốn kém nhất, make_unmake là move + undo_move
+        self.timings = {'win': 0.0, 'get_threatening_positions': 0.0, 'get_lite_best_moves': 0.0, 'make_unmake': 0.0}
+
+    @property
+    def effective_branching_factor(self):
+        ''' Hệ số phân nhánh hiệu dụng: căn bậc d của số trạng thái ở độ sâu sâu nhất d '''
+        depths = [depth for depth in self.nodes_by_depth if depth > 0]
+        if not depths:
+            return 0.0
+        deepest = max(depths)
+        return (self.nodes_by_depth[deepest] / self.nodes_by_depth.get(0, 1)) ** (1 / deepest)
+
+    @property
+    def first_move_cutoff_rate(self):
+        cutoffs = sum(self.cutoffs_by_depth.values())
+        return self.first_move_cutoffs / cutoffs if cutoffs else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'nodes_by_depth': dict(sorted(self.nodes_by_depth.items())),
+            'cutoffs_by_depth': dict(sorted(self.cutoffs_by_depth.items())),
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'pvs_researches': self.pvs_researches,
+            'aspiration_researches': self.aspiration_researches,
+            'depth': self.depth,
+            'elapsed': self.elapsed,
+            'nodes_per_second': self.nodes_per_second,
+            'effective_branching_factor': self.effective_branching_factor,
+            'tt_hits': self.tt_hits,
+            'tt_misses': self.tt_misses,
+            'source': self.source,
+            'timings': dict(self.timings),
+        }
+
+
 class GomokuBot:
     """
     This BOT can return the best move from a given Gomoku board game\n
     Usage:\n
-    Use take_turn_alpha_beta method and then get the choice property to get the best move
+    Use take_turn_alpha_beta method and then get the choice property to get the best move\n
+    backend is the board class used while searching, e.g. Gomoku or gomoku_bitboard.BitboardGomoku\n
+    tt is a TranspositionTable (can be shared between bots), otherwise a new one of tt_megabytes is created (0 disables it)\n
+    max_depth is the deepest search depth (MAX_DEPTH by default)\n
+    seed makes the random choices of the search repeatable\n
+    workers > 1 searches the root moves in a pool of that many processes\n
+    After each search, stats holds a SearchStats. profile=True also times the board methods,
+    callback(stats) is called every CALLBACK_INTERVAL nodes and after each finished depth,
+    verbose=False turns off all printing\n
+    batch_eval=True evaluates all children of a node with one state.evaluate_moves call to order and prune them\n
+    book is an opening_book.OpeningBook consulted before searching (only if it was built at least max_depth deep)\n
+    cache is a position_cache.PositionCache consulted before searching (after the book) and updated after each search\n
+    threat_search is a threat_search.ThreatSpaceSearch run before alpha-beta to find forced wins and forced defences\n
+    move_ordering=True orders the moves of each node by killer moves and a history table (after the TT and PV moves)\n
+    algorithm is 'minimax' (minimax_alpha_beta) or 'pvs' (negamax_pvs with aspiration windows when deepening iteratively)
     """
-    def __init__(self, gmk_game):
+    # số trạng thái giữa 2 lần gọi callback
+    CALLBACK_INTERVAL = 256
+    # số killer move được giữ ở mỗi độ sâu
+    KILLER_SLOTS = 2
+    # nửa độ rộng của aspiration window quanh điểm của lần tìm kiếm sâu dần trước
+    ASPIRATION_WINDOW = 2
+    ALGORITHMS = ('minimax', 'pvs')
+
+    def __init__(self, gmk_game, backend=Gomoku, tt=None, tt_megabytes=16, max_depth=MAX_DEPTH, seed=None, workers=None,
+                 profile=False, callback=None, verbose=True, batch_eval=False, book=None,
+                 cache=None, threat_search=None, move_ordering=False, algorithm='minimax'):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown search algorithm: {algorithm}")
         self.gmk_game = gmk_game
+        self.algorithm = algorithm
+        self.move_ordering = move_ordering
+        # killer move của mỗi độ sâu và bảng history (x, y) -> điểm, được giữ qua các lần tìm kiếm sâu dần
+        self._killers = []
+        self._history = {}
+        self.threat_search = threat_search
+        self.book = book
+        self.cache = cache
+        self.batch_eval = batch_eval
+        self.profile = profile
+        self.callback = callback
+        self.verbose = verbose
+        self.stats = SearchStats()
+        self.rng = random if seed is None else random.Random(seed)
+        self.workers = workers
+        self.max_depth = max_depth
+        # độ sâu của lần tìm kiếm hiện tại (nhỏ hơn max_depth khi tìm kiếm sâu dần)
+        self.depth_limit = max_depth
+        # giới hạn thời gian / số trạng thái của lần tìm kiếm hiện tại
+        self._deadline = None
+        self._node_limit = None
+        self._stop_requested = False
+        # principal variation: chuỗi nước đi tốt nhất của lần tìm kiếm trước, được thử đầu tiên ở lần tìm kiếm sau
+        self.pv = []
+        self._pv_table = []
+        self._follow_pv = False
+        self.backend = backend
+        if tt is None and tt_megabytes:
+            tt = TranspositionTable(tt_megabytes)
+        self.tt = tt
         self.name = gmk_game.active_turn
         self.opponent = 'O' if self.name == 'X' else 'X'
         self.choice = None
@@ -375,132 +999,525 @@ class GomokuBot:
             return -20 + depth
         return 0
 
+    def _enter_node(self, depth):
+        ''' Đếm trạng thái, gọi callback, kiểm tra giới hạn tìm kiếm và xóa principal variation cũ của độ sâu depth '''
+        stats = self.stats
+        stats.nodes += 1
+        stats.nodes_by_depth[depth] = stats.nodes_by_depth.get(depth, 0) + 1
+        if self.callback is not None and stats.nodes % self.CALLBACK_INTERVAL == 0:
+            self.callback(stats)
+        if self._deadline is not None or self._node_limit is not None:
+            self._check_budget()
+        if depth < len(self._pv_table):
+            self._pv_table[depth] = []
+
     def minimax_alpha_beta(self, state, depth, alpha, beta):
-        winner = state.win()
+        self._enter_node(depth)
+
+        # chỉ nước đi cuối cùng mới có thể tạo ra người thắng, vì cây tìm kiếm dừng lại ngay khi có người thắng
+        winner = state.win(last_move_only=depth > 0)
         if winner != 'N':
             final_score = self.score_alpha_beta(winner, depth)
             return final_score
-        elif depth > MAX_DEPTH:
+        elif depth > self.depth_limit:
             return 0
 
-        best_moves, threatening_point = state.get_best_moves()
+        # số tầng còn phải tìm từ trạng thái này
+        draft = self.depth_limit - depth + 1
+        tt_move = None
+        # không dùng bảng ở gốc để nước đi được chọn luôn được tìm lại
+        if self.tt is not None and depth > 0:
+            entry = self.tt.probe(state.zobrist_key)
+            if entry is not None:
+                tt_draft, tt_score, tt_flag, tt_move = entry
+                if tt_draft >= draft:
+                    score, flag = self._from_tt(state, depth, tt_score, tt_flag)
+                    if flag == TranspositionTable.EXACT \
+                            or (flag == TranspositionTable.LOWER_BOUND and score >= beta) \
+                            or (flag == TranspositionTable.UPPER_BOUND and score <= alpha):
+                        return score
+
+        best_moves, threatening_point = state.get_best_moves(self.rng)
+        best_moves = self._order_moves(state, depth, best_moves, tt_move)
 
+        alpha_origin, beta_origin = alpha, beta
+        best_move = None
         if state.active_turn == self.name:
             if depth == 0 and threatening_point >= 4:
                 self.choice = best_moves[0]
-                print("GET 1 QUICK SOLUTION!!!")
+                self._log("GET 1 QUICK SOLUTION!!!")
                 return
             
             max_score = -MINIMAX_INFINITY
-            for move in best_moves:
-                possible_game = state.get_new_state(move)
-                score = self.minimax_alpha_beta(possible_game, depth + 1, alpha, beta)
+            for index, move in enumerate(best_moves):
+                state.move(move)
+                score = self.minimax_alpha_beta(state, depth + 1, alpha, beta)
+                state.undo_move()
+                self._follow_pv = False
                 # get the best move
                 if depth == 0 and score > max_score:
                     self.choice = move
-                    print("GET 1 SOLUTION!!!")
+                    self._log("GET 1 SOLUTION!!!")
                 # -----
+                if score > max_score:
+                    best_move = move
+                    self._update_pv(depth, move)
                 max_score = max(max_score, score)
                 alpha = max(alpha, max_score)
                 if alpha >= beta:
+                    self._record_cutoff(depth, draft, move, index)
                     break
-            return max_score
+            result = max_score
         else:
             min_score = MINIMAX_INFINITY
-            for move in best_moves:
-                possible_game = state.get_new_state(move)
-                score = self.minimax_alpha_beta(possible_game, depth + 1, alpha, beta)
+            for index, move in enumerate(best_moves):
+                state.move(move)
+                score = self.minimax_alpha_beta(state, depth + 1, alpha, beta)
+                state.undo_move()
+                self._follow_pv = False
+                if score < min_score:
+                    best_move = move
+                    self._update_pv(depth, move)
                 min_score = min(min_score, score)
                 beta = min(beta, min_score)
                 if alpha >= beta:
+                    self._record_cutoff(depth, draft, move, index)
                     break
-            return min_score
+            result = min_score
+
+        if self.tt is not None:
+            if result <= alpha_origin:
+                flag = TranspositionTable.UPPER_BOUND
+            elif result >= beta_origin:
+                flag = TranspositionTable.LOWER_BOUND
+            else:
+                flag = TranspositionTable.EXACT
+            self._to_tt(state, depth, draft, result, flag, best_move)
+        return result
+
+    def _order_moves(self, state, depth, best_moves, tt_move):
+        ''' Thứ tự thử các nước đi best_moves của state ở độ sâu depth '''
+        if self.batch_eval and len(best_moves) > 1:
+            best_moves = self._order_by_evaluation(state, best_moves)
+        if self.move_ordering and len(best_moves) > 1:
+            best_moves = self._order_by_history(depth, best_moves)
+        # nước đi tốt nhất đã lưu được thử trước
+        if tt_move is not None and tt_move in best_moves and best_moves[0] != tt_move:
+            best_moves = [tt_move] + [move for move in best_moves if move != tt_move]
+        # đang đi theo principal variation của lần tìm kiếm trước thì thử nước đi của nó trước tiên
+        if self._follow_pv:
+            if depth < len(self.pv) and self.pv[depth] in best_moves:
+                pv_move = self.pv[depth]
+                best_moves = [pv_move] + [move for move in best_moves if move != pv_move]
+            else:
+                self._follow_pv = False
+        return best_moves
+
+    def negamax_pvs(self, state, depth, alpha, beta):
+        '''
+        Principal variation search dạng negamax: điểm theo góc nhìn của người đang tới lượt đi\n
+        Nước đi đầu tiên được tìm với cửa sổ (alpha, beta), các nước sau với cửa sổ rỗng (alpha, alpha + 1)
+        và chỉ được tìm lại với cửa sổ đầy đủ khi điểm của nó lớn hơn alpha
+        '''
+        self._enter_node(depth)
+        # điểm của bot -> điểm của người đang tới lượt đi
+        sign = 1 if state.active_turn == self.name else -1
+
+        winner = state.win(last_move_only=depth > 0)
+        if winner != 'N':
+            return sign * self.score_alpha_beta(winner, depth)
+        elif depth > self.depth_limit:
+            return 0
+
+        draft = self.depth_limit - depth + 1
+        tt_move = None
+        if self.tt is not None and depth > 0:
+            entry = self.tt.probe(state.zobrist_key)
+            if entry is not None:
+                tt_draft, tt_score, tt_flag, tt_move = entry
+                if tt_draft >= draft:
+                    # bảng lưu điểm theo góc nhìn của người tới lượt đi, giống như negamax
+                    score = tt_score - depth if tt_score > 0 else tt_score + depth if tt_score < 0 else 0
+                    if tt_flag == TranspositionTable.EXACT \
+                            or (tt_flag == TranspositionTable.LOWER_BOUND and score >= beta) \
+                            or (tt_flag == TranspositionTable.UPPER_BOUND and score <= alpha):
+                        return score
+
+        best_moves, threatening_point = state.get_best_moves(self.rng)
+        best_moves = self._order_moves(state, depth, best_moves, tt_move)
+        if depth == 0 and threatening_point >= 4:
+            self.choice = best_moves[0]
+            self._log("GET 1 QUICK SOLUTION!!!")
+            return
+
+        alpha_origin = alpha
+        best_score = -MINIMAX_INFINITY
+        best_move = None
+        for index, move in enumerate(best_moves):
+            state.move(move)
+            if index == 0:
+                score = -self.negamax_pvs(state, depth + 1, -beta, -alpha)
+            else:
+                score = -self.negamax_pvs(state, depth + 1, -alpha - 1, -alpha)
+                if alpha < score < beta:
+                    self.stats.pvs_researches += 1
+                    score = -self.negamax_pvs(state, depth + 1, -beta, -alpha)
+            state.undo_move()
+            self._follow_pv = False
+            if score > best_score:
+                best_score = score
+                best_move = move
+                self._update_pv(depth, move)
+                if depth == 0:
+                    self.choice = move
+                    self._log("GET 1 SOLUTION!!!")
+            alpha = max(alpha, best_score)
+            if alpha >= beta:
+                self._record_cutoff(depth, draft, move, index)
+                break
+
+        if self.tt is not None:
+            if best_score <= alpha_origin:
+                flag = TranspositionTable.UPPER_BOUND
+            elif best_score >= beta:
+                flag = TranspositionTable.LOWER_BOUND
+            else:
+                flag = TranspositionTable.EXACT
+            tt_score = best_score + depth if best_score > 0 else best_score - depth if best_score < 0 else 0
+            self.tt.store(state.zobrist_key, draft, tt_score, flag, best_move)
+        return best_score
+
+    def _order_by_history(self, depth, moves):
+        '''
+        Sắp xếp các nước đi (cùng điểm hăm dọa) theo killer move của độ sâu depth trước,
+        rồi theo bảng history (giảm dần), giữ nguyên thứ tự của get_best_moves nếu bằng nhau
+        '''
+        killers = self._killers[depth] if depth < len(self._killers) else ()
+        history = self._history
+
+        def key(move):
+            if move in killers:
+                return (0, killers.index(move))
+            return (1, -history.get((move.x, move.y), 0))
+
+        return sorted(moves, key=key)
+
+    def _record_cutoff(self, depth, draft, move, index):
+        ''' Ghi lại một lần cắt tỉa alpha-beta bởi nước đi thứ index: cập nhật thống kê, killer move và bảng history '''
+        stats = self.stats
+        stats.cutoffs_by_depth[depth] = stats.cutoffs_by_depth.get(depth, 0) + 1
+        if index == 0:
+            stats.first_move_cutoffs += 1
+        if self.move_ordering:
+            while len(self._killers) <= depth:
+                self._killers.append([])
+            killers = self._killers[depth]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[self.KILLER_SLOTS:]
+            cell = (move.x, move.y)
+            self._history[cell] = self._history.get(cell, 0) + draft * draft
+
+    def _order_by_evaluation(self, state, moves):
+        '''
+        Sắp xếp (và lọc) các nước đi của state bằng một lần gọi state.evaluate_moves\n
+        Nếu có nước thắng ngay thì chỉ cần nước đó. Các nước để lại cho đối thủ một đường 4 (thua ngay ở nước sau)
+        bị bỏ nếu còn nước khác. Các nước còn lại được sắp theo điểm hăm dọa của đối thủ (tăng dần), rồi của người đi (giảm dần)
+        '''
+        evaluations = state.evaluate_moves(moves)
+        for move, (winner, _, _) in zip(moves, evaluations):
+            if winner == state.active_turn:
+                return [move]
+        candidates = list(zip(moves, evaluations))
+        safe_candidates = [(move, evaluation) for move, evaluation in candidates if evaluation[2] < 4]
+        if safe_candidates:
+            candidates = safe_candidates
+        candidates.sort(key=lambda candidate: (candidate[1][2], -candidate[1][1]))
+        return [move for move, _ in candidates]
+
+    def _update_pv(self, depth, move):
+        ''' move là nước đi tốt nhất hiện tại ở độ sâu depth, nối thêm chuỗi nước đi tốt nhất của nhánh con '''
+        if depth + 1 < len(self._pv_table):
+            self._pv_table[depth] = [move] + self._pv_table[depth + 1]
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _install_timers(self, state):
+        ''' Đo thời gian các hàm tốn kém của bàn cờ state (chỉ dùng khi profile=True) '''
+        timings = self.stats.timings
+
+        def timed(name, method):
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    timings[name] += time.perf_counter() - start
+            return wrapper
+
+        for method_name, name in (('win', 'win'), ('threat_scores', 'get_threatening_positions'),
+                                  ('get_lite_best_moves', 'get_lite_best_moves'), ('move', 'make_unmake'), ('undo_move', 'make_unmake')):
+            setattr(state, method_name, timed(name, getattr(state, method_name)))
+
+    def _check_budget(self):
+        ''' Dừng tìm kiếm khi hết thời gian hoặc hết số trạng thái cho phép, hoặc khi stop() được gọi '''
+        if self._stop_requested \
+                or (self._node_limit is not None and self.stats.nodes > self._node_limit) \
+                or (self._deadline is not None and time.perf_counter() > self._deadline):
+            raise SearchAborted()
+
+    def stop(self):
+        '''
+        Yêu cầu dừng lần tìm kiếm đang chạy (có thể gọi từ luồng khác)\n
+        Lần tìm kiếm có time_budget_ms / node_budget trả về ngay nước đi của lần tìm kiếm sâu dần hoàn chỉnh sâu nhất
+        '''
+        self._stop_requested = True
+
+    def _to_tt(self, state, depth, draft, score, flag, best_move):
+        '''
+        Lưu điểm (theo góc nhìn của bot) vào bảng theo góc nhìn của bên tới lượt đi,
+        điểm thắng/thua được tính lại theo khoảng cách từ trạng thái này để dùng được ở độ sâu khác
+        '''
+        if state.active_turn != self.name:
+            score = -score
+            if flag != TranspositionTable.EXACT:
+                flag = TranspositionTable.LOWER_BOUND + TranspositionTable.UPPER_BOUND - flag
+        if score > 0:
+            score += depth
+        elif score < 0:
+            score -= depth
+        self.tt.store(state.zobrist_key, draft, score, flag, best_move)
 
-    def take_turn_alpha_beta(self):
+    def _from_tt(self, state, depth, score, flag):
+        ''' Ngược lại với _to_tt '''
+        if score > 0:
+            score -= depth
+        elif score < 0:
+            score += depth
+        if state.active_turn != self.name:
+            score = -score
+            if flag != TranspositionTable.EXACT:
+                flag = TranspositionTable.LOWER_BOUND + TranspositionTable.UPPER_BOUND - flag
+        return score, flag
+
+    def take_turn_alpha_beta(self, time_budget_ms=None, node_budget=None):
         """
         Changes the self.choice and then return the best move it can move from its current board game\n
-        This function does not change the given board game
+        This function does not change the given board game\n
+        With time_budget_ms and/or node_budget, the search deepens one level at a time (up to max_depth)
+        and returns the best move of the deepest level that finished within the budget
         """
-        self.minimax_alpha_beta(self.gmk_game, 0, -MINIMAX_INFINITY, MINIMAX_INFINITY)
-        print(f"solution:({self.choice.x}, {self.choice.y})")
+        start = time.perf_counter()
+        self.stats = SearchStats()
+        # thế cờ có trong opening book hoặc bộ nhớ đệm, hoặc có chuỗi nước ép buộc thì không cần tìm kiếm
+        known_move = None
+        if self.book is not None:
+            known_move = self.book.lookup(self.gmk_game, self.max_depth)
+            self.stats.source = 'book'
+        if known_move is None and self.cache is not None:
+            known_move = self.cache.lookup(self.gmk_game, self.max_depth)
+            self.stats.source = 'cache'
+        if known_move is None and self.threat_search is not None:
+            # threat-space search dùng chung time_budget_ms với alpha-beta và dừng khi stop() được gọi
+            deadline = None if time_budget_ms is None else start + time_budget_ms / 1000
+            known_move = self.threat_search.search(self.gmk_game, deadline=deadline, stop=lambda: self._stop_requested)
+            self.stats.source = 'threat_search'
+        if known_move is not None:
+            self.choice = known_move
+            self.pv = [known_move]
+            self.stats.elapsed = time.perf_counter() - start
+            self._stop_requested = False
+            self._log(f"{self.stats.source} solution:({self.choice.x}, {self.choice.y})")
+            return self.choice
+        self.stats.source = 'search'
+        self._killers = []
+        self._history = {}
+
+        # tìm kiếm trên một bản sao duy nhất, các nhánh con dùng move/undo_move thay vì sao chép bàn cờ
+        state = self.backend(self.gmk_game)
+        state.enable_threat_tracking()
+        if self.profile:
+            self._install_timers(state)
+        if self.tt is not None:
+            self.tt.new_search()
+            tt_hits, tt_misses = self.tt.hits, self.tt.misses
+        self.pv = []
+
+        if time_budget_ms is None and node_budget is None:
+            if self.workers is not None and self.workers > 1:
+                score = self._parallel_search(state)
+            else:
+                score = self._search(state, self.max_depth)
+        else:
+            if time_budget_ms is not None:
+                # phần còn lại của time_budget_ms sau opening book, bộ nhớ đệm và threat-space search
+                time_budget_ms = max(0.0, time_budget_ms - (time.perf_counter() - start) * 1000)
+            score = self._iterative_deepening(state, time_budget_ms, node_budget)
+        if self.cache is not None and self.stats.depth > 0:
+            self.cache.store(self.gmk_game, self.choice, score, self.stats.depth)
+
+        self.stats.elapsed = time.perf_counter() - start
+        if self.tt is not None:
+            self.stats.tt_hits = self.tt.hits - tt_hits
+            self.stats.tt_misses = self.tt.misses - tt_misses
+        if self.callback is not None:
+            self.callback(self.stats)
+        self._stop_requested = False
+        self._log(f"solution:({self.choice.x}, {self.choice.y})")
         return self.choice
 
+    def _search(self, state, depth_limit, alpha=-MINIMAX_INFINITY, beta=MINIMAX_INFINITY):
+        '''
+        Tìm kiếm với độ sâu depth_limit và cửa sổ (alpha, beta) ở gốc,
+        trả về điểm của nước đi tốt nhất (None nếu có nước thắng ngay)
+        '''
+        self.depth_limit = depth_limit
+        self.stats.nodes_by_depth = {}
+        self._pv_table = [[] for _ in range(depth_limit + 2)]
+        self._follow_pv = bool(self.pv)
+        if self.algorithm == 'pvs':
+            # ở gốc luôn là lượt của bot nên điểm negamax cũng là điểm của bot
+            score = self.negamax_pvs(state, 0, alpha, beta)
+        else:
+            score = self.minimax_alpha_beta(state, 0, alpha, beta)
+        self.pv = self._pv_table[0]
+        self.stats.depth = depth_limit
+        return score
 
-'''
-if __name__ == "__main__":
-    # Create a new Gomoku game
-    game = Gomoku()
-    bot = GomokuBot(game)
+    def _parallel_search(self, state):
+        '''
+        Tìm kiếm song song các nước đi ở gốc theo kiểu "young brothers wait":
+        nước đi đầu tiên được tìm ở đây để có alpha, các nước còn lại được tìm đồng thời trong các tiến trình con với alpha đó\n
+        Mỗi nước đi có seed riêng lấy từ self.rng nên kết quả chỉ phụ thuộc vào seed của bot
+        '''
+        best_moves, threatening_point = state.get_best_moves(self.rng)
+        if len(best_moves) < 2 or threatening_point >= 4:
+            return self._search(state, self.max_depth)
 
-    
-    game.board = [
-        ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
-        ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
-        ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
-        ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
-        ['N', 'N', 'N', 'N', 'X', 'N', 'N', 'O', 'N', 'N'],
-        ['N', 'N', 'N', 'X', 'O', 'N', 'O', 'N', 'N', 'N'],
-        ['N', 'N', 'N', 'X', 'O', 'O', 'N', 'N', 'N', 'N'],
-        ['N', 'N', 'X', 'N', 'O', 'N', 'N', 'N', 'N', 'N'],
-        ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
-        ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N']]
+        self.depth_limit = self.max_depth
+        self._pv_table = [[] for _ in range(self.max_depth + 2)]
+        self._follow_pv = False
+        first_move = best_moves[0]
+        state.move(first_move)
+        max_score = self._child_score(state, -MINIMAX_INFINITY)
+        state.undo_move()
+        self.choice = first_move
+        self._log("GET 1 SOLUTION!!!")
+
+        # bàn cờ ở gốc chưa kết thúc nên không cần tính lại kết quả khi mã hóa
+        board_data = state.to_bytes(status='N')
+        tasks = [(board_data, (move.x, move.y), self.backend, self.max_depth, max_score, self.rng.getrandbits(32), self.batch_eval,
+                  self.move_ordering, self.algorithm)
+                 for move in best_moves[1:]]
+        for move, (score, nodes) in zip(best_moves[1:], _get_executor(self.workers).map(_search_root_move, tasks)):
+            self.stats.nodes += nodes
+            # giống như tìm kiếm tuần tự: nước đi đứng trước được giữ nếu điểm bằng nhau
+            if score > max_score:
+                max_score = score
+                self.choice = move
+                self._log("GET 1 SOLUTION!!!")
+        self.pv = [self.choice]
+        self.stats.depth = self.max_depth
+        return max_score
+
+    def _child_score(self, state, alpha):
+        ''' Điểm (theo góc nhìn của bot) của state sau một nước đi của bot ở gốc, tìm với cửa sổ (alpha, MINIMAX_INFINITY) '''
+        if self.algorithm == 'pvs':
+            return -self.negamax_pvs(state, 1, -MINIMAX_INFINITY, -alpha)
+        return self.minimax_alpha_beta(state, 1, alpha, MINIMAX_INFINITY)
+
+    def _iterative_deepening(self, state, time_budget_ms, node_budget):
+        ''' Tìm kiếm sâu dần, trả về điểm của lần tìm kiếm hoàn chỉnh sâu nhất '''
+        deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000
+        completed_choice = None
+        completed_score = None
+        try:
+            for depth_limit in range(1, self.max_depth + 1):
+                if self.algorithm == 'pvs' and completed_score is not None:
+                    # aspiration window quanh điểm của lần tìm kiếm trước, tìm lại với cửa sổ đầy đủ nếu điểm nằm ngoài
+                    alpha, beta = completed_score - self.ASPIRATION_WINDOW, completed_score + self.ASPIRATION_WINDOW
+                    score = self._search(state, depth_limit, alpha, beta)
+                    if score is not None and (score <= alpha or score >= beta):
+                        self.stats.aspiration_researches += 1
+                        score = self._search(state, depth_limit)
+                else:
+                    score = self._search(state, depth_limit)
+                completed_choice = self.choice
+                completed_score = score
+                if self.callback is not None:
+                    self.callback(self.stats)
+                # đã tìm được nước thắng chắc chắn thì không cần tìm sâu hơn
+                if score is None or score > 0:
+                    break
+                if (deadline is not None and time.perf_counter() > deadline) or (node_budget is not None and self.stats.nodes > node_budget) \
+                        or self._stop_requested:
+                    break
+                # từ giờ có thể dừng bất cứ lúc nào vì đã có nước đi của 1 lần tìm kiếm hoàn chỉnh
+                self._deadline = deadline
+                self._node_limit = node_budget
+        except SearchAborted:
+            self.choice = completed_choice
+        finally:
+            self._deadline = None
+            self._node_limit = None
+            self.depth_limit = self.max_depth
+        return completed_score
+
+
+# các process pool được dùng lại giữa các lần tìm kiếm, theo số tiến trình
+_EXECUTORS = {}
+
+
+def _get_executor(workers):
+    if workers not in _EXECUTORS:
+        _EXECUTORS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _EXECUTORS[workers]
+
+
+def _search_root_move(task):
+    ''' Chạy trong tiến trình con: tìm điểm của một nước đi ở gốc, trả về (điểm, số trạng thái đã duyệt) '''
+    board_data, (x, y), backend, max_depth, alpha, seed, batch_eval, move_ordering, algorithm = task
+    game = Gomoku.from_bytes(board_data)
+    # mỗi nước đi có bảng và seed riêng để kết quả không phụ thuộc vào thứ tự các tiến trình nhận việc
+    bot = GomokuBot(game, backend=backend, tt_megabytes=1, max_depth=max_depth, seed=seed, verbose=False,
+                    batch_eval=batch_eval, move_ordering=move_ordering, algorithm=algorithm)
+    state = backend(game)
+    state.enable_threat_tracking()
+    bot._pv_table = [[] for _ in range(max_depth + 2)]
+    state.move(GomokuPos.at(x, y, state.size))
+    score = bot._child_score(state, alpha)
+    return score, bot.stats.nodes
+
+
+if __name__ == "__main__":
+    # Bàn cờ 10x10 để kiểm tra nhanh nước đi của bot
+    game = Gomoku.deserialize(json.dumps({
+        'board': [
+            ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
+            ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
+            ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
+            ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
+            ['N', 'N', 'N', 'N', 'X', 'N', 'N', 'O', 'N', 'N'],
+            ['N', 'N', 'N', 'X', 'O', 'N', 'O', 'N', 'N', 'N'],
+            ['N', 'N', 'N', 'X', 'O', 'O', 'N', 'N', 'N', 'N'],
+            ['N', 'N', 'X', 'N', 'O', 'N', 'N', 'N', 'N', 'N'],
+            ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N'],
+            ['N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N', 'N']],
+        'active_turn': 'O',
+    }))
 
     # FOR CHECK BOT'S MOVE
     # show before move
     print(game.count_moves())
     game.show_board()
-    game.active_turn = 'O'
-    bot.name = 'O'
-    
 
     print("Bot is thinking...")
+    bot = GomokuBot(game)
     bot_turn = bot.take_turn_alpha_beta()
     print("Bot moves:")
     game.move(bot_turn)
-    
+
     # show after move
     game.show_board()
-    
-    
-    
-    # FOR PLAY GAME
-    game.show_board()
-    while True:
-        # get Bot's turn
-        print("Bot is thinking...")
-        bot_turn = bot.take_turn_alpha_beta()
-
-        # Bot moves
-        print("Bot moves:")
-        game.move(bot_turn)
-        game.show_board()
-
-        # check result
-        winner = game.win()
-        if winner != 'N':
-            if winner == 'X':
-                print('X wins!')
-            elif winner == 'O':
-                print('O wins!')
-            else:
-                print('Tie!')
-            break
-
-        # get user's move and move
-        game.move(GomokuPos(int(input('x=')), int(input('y='))))
-        game.show_board()
-
-        # check result
-        winner = game.win()
-        if winner != 'N':
-            if winner == 'X':
-                print('X wins!')
-            elif winner == 'O':
-                print('O wins!')
-            else:
-                print('Tie!')
-            break
-'''
-    
-
-
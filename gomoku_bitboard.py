@@ -0,0 +1,275 @@
+import json
+from functools import lru_cache
+
+from gomoku import BOARD_SIZE, WIN_LENGTH, Gomoku, get_geometry, stack_threatening_point
+
+
+def _iter_bits(mask):
+    ''' Duyệt các bit bằng 1 của mask theo thứ tự tăng dần (tức là theo dòng, từ trái qua phải) '''
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitboardTables:
+    """
+    Các bảng bitboard của một BoardGeometry, chỉ được tạo 1 lần cho mỗi kích thước (xem get_bitboard_tables)\n
+    Mỗi dòng của bàn cờ chiếm size + 1 bit, bit cuối cùng luôn bằng 0 để phép dịch bit không bị tràn sang dòng khác,
+    ô (x, y) ứng với bit x * row_width + y
+    """
+    def __init__(self, geometry):
+        size = geometry.size
+        self.size = size
+        self.win_length = geometry.win_length
+        self.row_width = size + 1
+        self.valid_mask = sum(((1 << size) - 1) << (x * self.row_width) for x in range(size))
+        # 4 hướng: ngang, dọc, chéo chính, chéo phụ (cùng thứ tự duyệt với Gomoku.threat_scores)
+        self.directions = (1, self.row_width, self.row_width + 1, self.row_width - 1)
+        # với mỗi hướng, ánh xạ bit của một ô -> (chỉ số đường, vị trí trong đường) theo chỉ mục geometry.lines,
+        # tức là theo đúng thứ tự mà Gomoku.threat_scores duyệt
+        self.line_positions = [{} for _ in self.directions]
+        for line_index, (line, direction) in enumerate(zip(geometry.lines, geometry.line_directions)):
+            for offset, (x, y) in enumerate(line):
+                self.line_positions[direction][x * self.row_width + y] = (line_index, offset)
+        # GomokuPos dùng chung của mỗi ô
+        self.positions = {x * self.row_width + y: geometry.positions[x * size + y] for x in range(size) for y in range(size)}
+        # mask 8 ô xung quanh mỗi ô, và bình phương khoảng cách tới tâm bàn cờ của mỗi ô
+        self.neighbour_masks = {x * self.row_width + y: self._neighbour_mask(x, y) for x in range(size) for y in range(size)}
+        self.center_distance = {x * self.row_width + y: distance for (x, y), distance in geometry.center_distance.items()}
+        # các mẫu hăm dọa theo thứ tự mẫu: (mẫu, điểm hăm dọa, các vị trí N)
+        self.patterns = {opponent: [(pattern, threatening_point, empty_offsets)
+                                    for pattern, (_, threatening_point, empty_offsets) in pattern_table.items()]
+                         for opponent, pattern_table in geometry.pattern_tables.items()}
+
+    def bit(self, x, y):
+        return 1 << (x * self.row_width + y)
+
+    def _neighbour_mask(self, x, y):
+        ''' Mask 8 ô xung quanh ô (x, y) '''
+        return sum(self.bit(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                   if (dx, dy) != (0, 0) and 0 <= x + dx < self.size and 0 <= y + dy < self.size)
+
+    def has_line(self, mask):
+        ''' Kiểm tra song song trên toàn bộ bàn cờ xem mask có chứa win_length quân liên tiếp theo hướng nào không '''
+        for d in self.directions:
+            # m là mask các ô bắt đầu của run quân liên tiếp, run tăng gấp đôi sau mỗi bước
+            m, run = mask, 1
+            while run * 2 <= self.win_length:
+                m &= m >> (run * d)
+                run *= 2
+            if run < self.win_length:
+                m &= m >> ((self.win_length - run) * d)
+            if m:
+                return True
+        return False
+
+    def match_pattern(self, pattern, masks, direction):
+        '''
+        Trả về mask các ô bắt đầu của mẫu pattern theo hướng direction\n
+        masks là dict ký tự ('X', 'O', 'N') -> mask các ô có ký tự đó
+        '''
+        d = self.directions[direction]
+        m = self.valid_mask
+        for k, char in enumerate(pattern):
+            m &= masks[char] >> (k * d)
+            if not m:
+                break
+        return m
+
+
+@lru_cache(maxsize=None)
+def get_bitboard_tables(geometry):
+    return BitboardTables(geometry)
+
+
+class BitboardGomoku(Gomoku):
+    """
+    Bàn cờ Caro dùng bitboard: mỗi người chơi là một số nguyên Python, mỗi bit là một ô\n
+    Có cùng API với Gomoku (move, undo_move, win, have_occupied, count_moves, serialize,...) nên có thể dùng cho GomokuBot
+    """
+    def __init__(self, other=None, size=BOARD_SIZE, win_length=WIN_LENGTH):
+        self.geometry = other.geometry if other is not None else get_geometry(size, win_length)
+        self.tables = get_bitboard_tables(self.geometry)
+        self.bits = {'X': 0, 'O': 0}
+        self.threat_hits = None
+        if other is None:
+            self.active_turn = 'X'
+            self.last_move = None
+            self.stone_count = 0
+            self.move_stack = []
+            self.zobrist_key = 0
+        else:
+            if isinstance(other, BitboardGomoku):
+                self.bits = dict(other.bits)
+            else:
+                for i, row in enumerate(other.board):
+                    for j, cell in enumerate(row):
+                        if cell != 'N':
+                            self.bits[cell] |= self.tables.bit(i, j)
+            self.active_turn = other.active_turn
+            self.last_move = other.last_move
+            self.stone_count = other.stone_count
+            self.move_stack = other.move_stack[:]
+            self.zobrist_key = other.zobrist_key
+
+    @property
+    def board(self):
+        ''' Bàn cờ dạng list of lists giống Gomoku.board (chỉ để đọc) '''
+        x_bits, o_bits = self.bits['X'], self.bits['O']
+        size = self.geometry.size
+        board = []
+        for i in range(size):
+            row = []
+            for j in range(size):
+                b = self.tables.bit(i, j)
+                row.append('X' if x_bits & b else 'O' if o_bits & b else 'N')
+            board.append(row)
+        return board
+
+    def serialize(self):
+        """Convert the object state to a JSON string (same format as Gomoku.serialize)."""
+        return json.dumps({
+            'board': self.board,
+            'active_turn': self.active_turn,
+            'win_length': self.win_length,
+        })
+
+    @classmethod
+    def deserialize(cls, json_str):
+        """Create an object instance from a JSON string."""
+        return cls(Gomoku.deserialize(json_str))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Create an object instance from the output of Gomoku.to_bytes."""
+        return cls(Gomoku.from_bytes(data))
+
+    def win(self, last_move_only=False):
+        """
+        Check if there's a winner or if the game is tied.\n
+        With last_move_only=True only the player who made the last move is checked.\n
+        Returns:
+            'X' or 'O' if a player has won\n
+            'T' if the game is tied\n
+            'N' if the game is ongoing\n
+        """
+        if last_move_only and self.last_move is not None:
+            players = ('O' if self.active_turn == 'X' else 'X',)
+        else:
+            players = ('X', 'O')
+        for player in players:
+            if self.tables.has_line(self.bits[player]):
+                return player
+
+        if self.stone_count == self.geometry.size * self.geometry.size:
+            return 'T'
+        return 'N'
+
+    def move(self, pos):
+        """ Place the stone of the active player at the specified position. """
+        geometry = self.geometry
+        b = self.tables.bit(pos.x, pos.y)
+        if 0 <= pos.x < geometry.size and 0 <= pos.y < geometry.size and not (self.bits['X'] | self.bits['O']) & b:
+            self.bits[self.active_turn] |= b
+            self.last_move = pos
+            self.stone_count += 1
+            self.move_stack.append(pos)
+            self.zobrist_key ^= geometry.zobrist_keys[self.active_turn][pos.x][pos.y] ^ geometry.zobrist_side_key
+            self.active_turn = 'O' if self.active_turn == 'X' else 'X'
+        else:
+            raise ValueError("Invalid move: position already occupied or out of bounds.")
+
+    def undo_move(self):
+        """ Take back the last move made with move(). """
+        if not self.move_stack:
+            raise ValueError("Invalid undo: no move to take back.")
+        pos = self.move_stack.pop()
+        self.active_turn = 'O' if self.active_turn == 'X' else 'X'
+        self.bits[self.active_turn] &= ~self.tables.bit(pos.x, pos.y)
+        self.zobrist_key ^= self.geometry.zobrist_keys[self.active_turn][pos.x][pos.y] ^ self.geometry.zobrist_side_key
+        self.stone_count -= 1
+        self.last_move = self.move_stack[-1] if self.move_stack else None
+
+    def enable_threat_tracking(self):
+        ''' Không cần thiết với bitboard: các mẫu hăm dọa đã được tìm song song trên toàn bộ bàn cờ '''
+
+    def have_occupied(self, pos):
+        ''' Trả về True nếu vị trí hiện tại bị chiếm bởi X hoặc O'''
+        return bool((self.bits['X'] | self.bits['O']) & self.tables.bit(pos.x, pos.y))
+
+    def cell(self, x, y):
+        ''' Giá trị của ô (x, y): 'X', 'O' hoặc 'N' '''
+        b = self.tables.bit(x, y)
+        return 'X' if self.bits['X'] & b else 'O' if self.bits['O'] & b else 'N'
+
+    def threat_scores(self, opponent):
+        '''
+        Giống Gomoku.threat_scores nhưng mỗi mẫu hăm dọa được tìm song song trên toàn bộ bàn cờ theo từng hướng\n
+        Kết quả (kể cả thứ tự các vị trí) giống hệt Gomoku.threat_scores
+        '''
+        tables = self.tables
+        masks = {'X': self.bits['X'], 'O': self.bits['O'], 'N': tables.valid_mask & ~(self.bits['X'] | self.bits['O'])}
+
+        # mỗi lần khớp mẫu được ghi lại cùng với khóa sắp xếp theo thứ tự duyệt của Gomoku.threat_scores
+        hits = []
+        for pattern_index, (pattern, threatening_point, empty_offsets) in enumerate(tables.patterns[opponent]):
+            for direction, d in enumerate(tables.directions):
+                line_positions = tables.line_positions[direction]
+                for start in _iter_bits(tables.match_pattern(pattern, masks, direction)):
+                    line, offset = line_positions[start]
+                    for k in empty_offsets:
+                        hits.append(((pattern_index, line, offset, k), start + k * d, threatening_point))
+
+        if not hits:
+            return [], 0
+
+        hits.sort()
+        scores = {}
+        for _, cell, threatening_point in hits:
+            if cell in scores:
+                scores[cell] = stack_threatening_point(scores[cell], threatening_point)
+            else:
+                scores[cell] = threatening_point
+        positions = tables.positions
+        return [(positions[cell], point) for cell, point in scores.items()], max(scores.values())
+
+    def get_lite_best_moves(self, me):
+        '''
+        Return lite-best moves of the me player (same result as Gomoku.get_lite_best_moves)
+        '''
+        MOVE_LIMITED = 4
+        tables = self.tables
+        allies = self.bits[me]
+        empty = tables.valid_mask & ~(self.bits['X'] | self.bits['O'])
+        # các ô trống có ít nhất 1 quân giống xung quanh
+        near = 0
+        for d in tables.directions:
+            near |= (allies << d) | (allies >> d)
+        near &= empty
+
+        best_moves = []
+        max_allies = 0
+        for cell in _iter_bits(near):
+            num_allies = (allies & tables.neighbour_masks[cell]).bit_count()
+            if num_allies > max_allies:
+                best_moves = [cell]
+                max_allies = num_allies
+            elif num_allies == max_allies:
+                best_moves.append(cell)
+        if not best_moves:
+            # không có ô nào cạnh quân giống: mọi ô trống đều như nhau
+            best_moves = list(_iter_bits(empty))
+
+        if len(best_moves) >= MOVE_LIMITED:
+            best_moves.sort(key=tables.center_distance.__getitem__)
+            best_moves = best_moves[0:MOVE_LIMITED]
+        return [tables.positions[cell] for cell in best_moves]
+
+    def count_moves(self):
+        '''
+        Returns (number X, number O, number blank) have moved on the current table
+        '''
+        cx = self.bits['X'].bit_count()
+        co = self.bits['O'].bit_count()
+        return cx, co, self.geometry.size * self.geometry.size - cx - co
@@ -0,0 +1,207 @@
+from functools import lru_cache
+
+from gomoku import BOARD_SIZE, EXTRA_THREATENING_POINT, WIN_LENGTH, Gomoku, threat_scores_from_hits
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:
+    np = None
+
+# NumPy là tùy chọn: khi không có NumPy, NumpyGomoku dùng lại các hàm Python của Gomoku
+HAVE_NUMPY = np is not None
+
+# mã của mỗi ô: N = 0, X = 1, O = 2, ô nằm ngoài bàn cờ (dùng để đệm các đường ngắn) = 3
+CELL_CODES = {'N': 0, 'X': 1, 'O': 2}
+OUTSIDE_CODE = 3
+
+
+class NumpyTables:
+    """
+    Các bảng NumPy của một BoardGeometry, chỉ được tạo 1 lần cho mỗi kích thước (xem get_numpy_tables)
+    """
+    def __init__(self, geometry):
+        size = geometry.size
+        self.geometry = geometry
+        # chỉ số (trong mảng bàn cờ 1 chiều) của các ô trên mỗi đường của geometry.lines, các đường ngắn được đệm bằng ô ngoài bàn cờ
+        self.outside_index = size * size
+        self.line_index = np.full((len(geometry.lines), size), self.outside_index, dtype=np.intp)
+        for line_index, line in enumerate(geometry.lines):
+            self.line_index[line_index, :len(line)] = [x * size + y for x, y in line]
+        self.window_weights = {length: 4 ** np.arange(length, dtype=np.int32) for length in geometry.pattern_lengths}
+        self.code_tables = self._build_code_tables()
+        # thông tin mẫu theo thứ tự mẫu: (điểm hăm dọa, các vị trí N)
+        self.pattern_info = {opponent: {pattern_index: (threatening_point, empty_offsets)
+                                        for pattern_index, threatening_point, empty_offsets in pattern_table.values()}
+                             for opponent, pattern_table in geometry.pattern_tables.items()}
+        self.pattern_points, self.pattern_empty_masks = self._build_pattern_arrays()
+        # mã của cửa sổ win_length ô toàn quân của một người chơi (thắng)
+        win_length = geometry.win_length
+        self.win_codes = {player: int(code * self.window_weights[win_length].sum()) for player, code in CELL_CODES.items() if player != 'N'}
+        # bình phương khoảng cách tới tâm bàn cờ, dùng để lọc nước đi trong get_lite_best_moves
+        self.center_distance = np.array([geometry.center_distance[(x, y)] for x in range(size) for y in range(size)])
+
+    def _build_code_tables(self):
+        '''
+        Với mỗi opponent và mỗi độ dài mẫu L: mảng 4**L phần tử, mã của một cửa sổ -> thứ tự mẫu + 1 (0 nếu không phải mẫu hăm dọa)\n
+        Mã của cửa sổ c[0..L-1] là tổng c[k] * 4**k
+        '''
+        tables = {}
+        for opponent, pattern_table in self.geometry.pattern_tables.items():
+            tables[opponent] = {length: np.zeros(4 ** length, dtype=np.int16) for length in self.geometry.pattern_lengths}
+            for pattern, (pattern_index, _, _) in pattern_table.items():
+                code = sum(CELL_CODES[char] * 4 ** k for k, char in enumerate(pattern))
+                tables[opponent][len(pattern)][code] = pattern_index + 1
+        return tables
+
+    def _build_pattern_arrays(self):
+        '''
+        Dạng mảng của pattern_info dùng cho evaluate_moves, đánh chỉ số theo giá trị của code_tables (thứ tự mẫu + 1):\n
+        điểm hăm dọa của mỗi mẫu, và với mỗi độ dài L, mask các vị trí N trong mẫu
+        '''
+        points, empty_masks = {}, {}
+        for opponent, pattern_table in self.geometry.pattern_tables.items():
+            points[opponent] = np.zeros(len(pattern_table) + 1, dtype=np.int8)
+            empty_masks[opponent] = {length: np.zeros((len(pattern_table) + 1, length), dtype=bool) for length in self.geometry.pattern_lengths}
+            for pattern, (pattern_index, threatening_point, empty_offsets) in pattern_table.items():
+                points[opponent][pattern_index + 1] = threatening_point
+                empty_masks[opponent][len(pattern)][pattern_index + 1, list(empty_offsets)] = True
+        return points, empty_masks
+
+
+@lru_cache(maxsize=None)
+def get_numpy_tables(geometry):
+    return NumpyTables(geometry)
+
+
+class NumpyGomoku(Gomoku):
+    """
+    Bàn cờ Caro tìm mẫu hăm dọa bằng NumPy: bàn cờ được mã hóa thành mảng int8,
+    mọi cửa sổ dài 5, 6, 7 trên 4 hướng được lấy ra cùng lúc bằng sliding_window_view và tra bảng mã\n
+    Kết quả giống hệt Gomoku. Nếu không có NumPy, các hàm của Gomoku được dùng
+    """
+    def __init__(self, other=None, size=BOARD_SIZE, win_length=WIN_LENGTH):
+        super().__init__(other, size, win_length)
+        # NumPy tự tìm lại toàn bộ bàn cờ rất nhanh nên không cần cập nhật điểm hăm dọa theo từng nước đi
+        self.threat_hits = None
+        if HAVE_NUMPY:
+            self.tables = get_numpy_tables(self.geometry)
+            self.cells = np.full(self.size * self.size + 1, OUTSIDE_CODE, dtype=np.int8)
+            self.cells[:-1] = [CELL_CODES[cell] for row in self.board for cell in row]
+
+    @classmethod
+    def deserialize(cls, json_str):
+        """Create an object instance from a JSON string."""
+        return cls(Gomoku.deserialize(json_str))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Create an object instance from the output of Gomoku.to_bytes."""
+        return cls(Gomoku.from_bytes(data))
+
+    def enable_threat_tracking(self):
+        ''' Không cần thiết với NumPy: toàn bộ bàn cờ được tìm lại trong một lần '''
+
+    def move(self, pos):
+        super().move(pos)
+        if HAVE_NUMPY:
+            self.cells[pos.x * self.geometry.size + pos.y] = CELL_CODES[self.board[pos.x][pos.y]]
+
+    def undo_move(self):
+        pos = self.move_stack[-1] if self.move_stack else None
+        super().undo_move()
+        if HAVE_NUMPY:
+            self.cells[pos.x * self.geometry.size + pos.y] = CELL_CODES['N']
+
+    def threat_scores(self, opponent):
+        '''
+        Giống Gomoku.threat_scores (cùng kết quả và thứ tự) nhưng mọi cửa sổ được tra bảng cùng lúc
+        '''
+        if not HAVE_NUMPY:
+            return super().threat_scores(opponent)
+
+        tables = self.tables
+        lines = self.cells[tables.line_index].astype(np.int32)
+        pattern_info = tables.pattern_info[opponent]
+        hits = []
+        for length in self.geometry.pattern_lengths:
+            codes = sliding_window_view(lines, length, axis=1) @ tables.window_weights[length]
+            matches = tables.code_tables[opponent][length][codes]
+            for line_index, start in zip(*np.nonzero(matches)):
+                line_index, start = int(line_index), int(start)
+                pattern_index = int(matches[line_index, start]) - 1
+                threatening_point, empty_offsets = pattern_info[pattern_index]
+                line = self.geometry.lines[line_index]
+                for k in empty_offsets:
+                    hits.append(((pattern_index, line_index, start, k), line[start+k], threatening_point))
+        return threat_scores_from_hits(hits, self.geometry.positions, self.geometry.size)
+
+    def evaluate_moves(self, moves):
+        '''
+        Giống Gomoku.evaluate_moves nhưng mọi bàn cờ con được tạo và đánh giá cùng lúc:
+        mảng (số nước đi, số đường, size) chứa mọi đường của mọi bàn cờ con được tra bảng mã trong 1 lần
+        '''
+        if not HAVE_NUMPY or not moves:
+            return super().evaluate_moves(moves)
+
+        tables = self.tables
+        size = self.geometry.size
+        me = self.active_turn
+        op = 'X' if me == 'O' else 'O'
+        count = len(moves)
+        boards = np.tile(self.cells, (count, 1))
+        boards[np.arange(count), [move.x * size + move.y for move in moves]] = CELL_CODES[me]
+        lines = boards[:, tables.line_index].astype(np.int32)
+        codes = {length: sliding_window_view(lines, length, axis=2) @ tables.window_weights[length] for length in self.geometry.pattern_lengths}
+
+        wins = (codes[self.geometry.win_length] == tables.win_codes[me]).any(axis=(1, 2))
+        full = self.stone_count + 1 == size * size
+        me_points = _threat_maxima(tables, codes, me, count)
+        op_points = _threat_maxima(tables, codes, op, count)
+        return [(me if won else 'T' if full else 'N', me_point, op_point)
+                for won, me_point, op_point in zip(wins.tolist(), me_points.tolist(), op_points.tolist())]
+
+    def get_lite_best_moves(self, me):
+        '''
+        Giống Gomoku.get_lite_best_moves, số quân giống ở 8 ô xung quanh mọi ô được tính bằng 1 phép tích chập 3x3
+        '''
+        if not HAVE_NUMPY:
+            return super().get_lite_best_moves(me)
+
+        MOVE_LIMITED = 4
+        size = self.geometry.size
+        board = self.cells[:-1].reshape(size, size)
+        allies = np.pad((board == CELL_CODES[me]).astype(np.int8), 1)
+        num_allies = sliding_window_view(allies, (3, 3)).sum(axis=(2, 3)) - allies[1:-1, 1:-1]
+        empty = (board == CELL_CODES['N']).ravel()
+        if not empty.any():
+            return []
+        num_allies = num_allies.ravel()
+        max_allies = num_allies[empty].max()
+        # các ô theo thứ tự dòng, giống như khi duyệt bằng 2 vòng lặp
+        best_cells = np.flatnonzero(empty & (num_allies == max_allies))
+        if len(best_cells) >= MOVE_LIMITED:
+            # sắp xếp ổn định theo khoảng cách tới tâm (cùng thứ tự với Gomoku.get_lite_best_moves)
+            best_cells = best_cells[np.argsort(self.tables.center_distance[best_cells], kind='stable')[:MOVE_LIMITED]]
+        return [self.geometry.positions[cell] for cell in best_cells.tolist()]
+
+
+def _threat_maxima(tables, codes, opponent, count):
+    '''
+    Điểm hăm dọa cao nhất của opponent trên mỗi bàn cờ (giống threat_scores(opponent)[1])\n
+    codes là dict độ dài L -> mã các cửa sổ dài L, mảng (số bàn cờ, số đường, số vị trí bắt đầu)
+    '''
+    # điểm cao nhất và số mẫu hăm dọa dồn vào mỗi ô của mỗi bàn cờ
+    best_points = np.zeros((count, tables.outside_index + 1), dtype=np.int8)
+    hit_counts = np.zeros((count, tables.outside_index + 1), dtype=np.int16)
+    for length, length_codes in codes.items():
+        matches = tables.code_tables[opponent][length][length_codes]
+        board_index, line_index, start = np.nonzero(matches)
+        patterns = matches[board_index, line_index, start]
+        match_index, offset = np.nonzero(tables.pattern_empty_masks[opponent][length][patterns])
+        hit_boards = board_index[match_index]
+        hit_cells = tables.line_index[line_index[match_index], start[match_index] + offset]
+        np.maximum.at(best_points, (hit_boards, hit_cells), tables.pattern_points[opponent][patterns[match_index]])
+        np.add.at(hit_counts, (hit_boards, hit_cells), 1)
+    # cùng kết quả với stack_threatening_point: điểm cao nhất, cộng thêm EXTRA_THREATENING_POINT nếu có từ 2 mẫu trở lên
+    return (best_points + EXTRA_THREATENING_POINT * (hit_counts >= 2)).max(axis=1)
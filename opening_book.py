@@ -0,0 +1,153 @@
+'''
+Opening book: nước đi có sẵn cho các thế cờ đầu ván, tra cứu theo khóa chung của 8 bàn cờ đối xứng (Gomoku.canonical_key)
+Book chỉ dùng cho kích thước bàn cờ đã ghi trong file, với luật thắng mặc định (WIN_LENGTH quân liên tiếp)
+
+Định dạng file: 8 byte đầu (chuỗi GMKB, phiên bản, kích thước bàn cờ, số quân nhiều nhất của các thế cờ trong book,
+độ sâu tìm kiếm của các ván tự chơi đã tạo ra book; phiên bản 1 không có độ sâu, byte này bị bỏ trống),
+rồi các bản ghi 10 byte (khóa uint64, ô x * kích thước + y uint16 của nước đi trên bàn cờ đã đưa về dạng chuẩn), sắp xếp theo khóa.
+File được map vào bộ nhớ và tìm kiếm nhị phân nên mở book gần như không tốn thời gian
+
+Bot chỉ dùng book nếu độ sâu đã tạo ra book không nhỏ hơn max_depth của nó, để book không thay các nước đi tìm được sâu hơn
+
+Build a book from self-play:
+    python opening_book.py --output opening_book.bin [--games 200] [--plies 8] [--max-depth 6] [--explore 0.5] [--seed 0] [--size 20]
+'''
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from collections import Counter
+
+from gomoku import BOARD_SIZE, MAX_DEPTH, WIN_LENGTH, Gomoku, GomokuBot, GomokuPos, symmetric_pos
+
+BOOK_MAGIC = b'GMKB'
+BOOK_VERSION = 2
+# các phiên bản đọc được (phiên bản 1 không lưu độ sâu, coi như 0 nên không bao giờ được dùng thay cho tìm kiếm)
+BOOK_VERSIONS = (1, 2)
+BOOK_HEADER = struct.Struct('<4sBBBB')
+BOOK_RECORD = struct.Struct('<QH')
+# file book mặc định, được các ứng dụng mở khi khởi động nếu có
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+
+class OpeningBook:
+    """
+    Opening book chỉ đọc, được map vào bộ nhớ từ file do write_book tạo ra\n
+    Usage:\n
+    book = OpeningBook(path), rồi book.lookup(game, depth) trả về GomokuPos hoặc None nếu thế cờ không có trong book
+    hoặc book được tạo với độ sâu nhỏ hơn depth
+    """
+    def __init__(self, path=BOOK_FILE):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < BOOK_HEADER.size:
+            raise ValueError("Invalid opening book: file too short.")
+        magic, version, self.board_size, self.max_stones, self.depth = BOOK_HEADER.unpack_from(self.data)
+        if magic != BOOK_MAGIC or version not in BOOK_VERSIONS:
+            raise ValueError("Invalid opening book: unknown format.")
+        if version == 1:
+            self.depth = 0
+        self.size = (len(self.data) - BOOK_HEADER.size) // BOOK_RECORD.size
+
+    def __len__(self):
+        return self.size
+
+    def _find(self, key):
+        ''' Tìm nhị phân bản ghi có khóa key, trả về ô của nước đi hoặc None '''
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            record_key, cell = BOOK_RECORD.unpack_from(self.data, BOOK_HEADER.size + middle * BOOK_RECORD.size)
+            if record_key == key:
+                return cell
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def lookup(self, game, depth=0):
+        '''
+        Trả về nước đi của book cho người chơi đang tới lượt của game, None nếu thế cờ không có trong book
+        hoặc book được tạo với độ sâu nhỏ hơn depth (khi đó tìm kiếm sẽ cho nước đi tốt hơn)
+        '''
+        if self.depth < depth or game.stone_count > self.max_stones or game.size != self.board_size or game.win_length != WIN_LENGTH:
+            return None
+        key, symmetry = game.canonical_key()
+        cell = self._find(key)
+        if cell is None:
+            return None
+        move = GomokuPos(*symmetric_pos(*divmod(cell, self.board_size), symmetry, inverse=True, size=self.board_size))
+        # khóa trùng nhau (rất hiếm) có thể trả về một ô đã có quân
+        if not move.valid_pos(self.board_size) or game.have_occupied(move):
+            return None
+        return move
+
+    def close(self):
+        self.data.close()
+
+
+def load_book(path=BOOK_FILE):
+    ''' Mở book tại path, trả về None nếu không có file '''
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+
+def write_book(path, entries, max_stones, depth, size=BOARD_SIZE):
+    '''
+    Ghi book của bàn cờ size x size, tạo bởi các ván tự chơi với độ sâu depth, ra file path\n
+    entries là dict khóa chung (Gomoku.canonical_key) -> (x, y) của nước đi trên bàn cờ đã đưa về dạng chuẩn
+    '''
+    with open(path, 'wb') as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, size, max_stones, depth))
+        for key in sorted(entries):
+            x, y = entries[key]
+            f.write(BOOK_RECORD.pack(key, x * size + y))
+
+
+def build_book(games, plies, max_depth, explore, seed, size=BOARD_SIZE):
+    '''
+    Tạo các mục của book từ các ván bot tự chơi với nhau, mỗi ván chỉ chơi plies nước đầu\n
+    Với xác suất explore, nước đi của một ván được chọn ngẫu nhiên gần các quân đã có (để book có cả những thế cờ bot không tự đi tới),
+    nhưng nước bot chọn cho thế cờ đó vẫn được ghi lại. Nước được bot chọn nhiều nhất cho mỗi thế cờ được giữ lại
+    '''
+    rng = random.Random(seed)
+    votes = {}
+    for _ in range(games):
+        game = Gomoku(size=size)
+        for _ in range(plies):
+            bot = GomokuBot(game, max_depth=max_depth, seed=rng.getrandbits(32), verbose=False)
+            choice = bot.take_turn_alpha_beta()
+            key, symmetry = game.canonical_key()
+            votes.setdefault(key, Counter())[symmetric_pos(choice.x, choice.y, symmetry, size=size)] += 1
+            if rng.random() < explore:
+                choice = rng.choice(game.get_lite_best_moves(game.active_turn))
+            game.move(choice)
+            if game.win() != 'N':
+                break
+    return {key: counter.most_common(1)[0][0] for key, counter in votes.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=BOOK_FILE)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--plies', type=int, default=8, help='number of opening moves of each game stored in the book')
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH, help='search depth of the self-play games (the bot skips a book built shallower than its own max_depth)')
+    parser.add_argument('--explore', type=float, default=0.5, help='probability of playing a random nearby move instead of the bot move')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--size', type=int, default=BOARD_SIZE, help='board size')
+    args = parser.parse_args()
+
+    entries = build_book(args.games, args.plies, args.max_depth, args.explore, args.seed, args.size)
+    # thế cờ cuối cùng được ghi có plies - 1 quân
+    write_book(args.output, entries, args.plies - 1, args.max_depth, args.size)
+    print(f"{len(entries)} positions written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
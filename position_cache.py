@@ -0,0 +1,174 @@
+'''
+Bộ nhớ đệm trên đĩa các nước đi đã tìm được, dùng chung giữa các tiến trình và giữa các lần chạy
+
+Mỗi thế cờ được lưu theo khóa chung của 8 bàn cờ đối xứng (Gomoku.canonical_key) cùng với nước đi tốt nhất
+(trên bàn cờ đã đưa về dạng chuẩn), điểm và độ sâu tìm kiếm. Dữ liệu nằm trong một file SQLite ở chế độ WAL
+nên nhiều tiến trình có thể đọc và ghi cùng lúc. Khi số thế cờ vượt quá max_entries, các thế cờ lâu nhất không dùng bị xóa
+
+File mặc định nằm trong thư mục cache của người dùng ($XDG_CACHE_HOME hoặc ~/.cache, %LOCALAPPDATA% trên Windows)/gomoku,
+biến môi trường GOMOKU_CACHE_FILE chọn file khác
+'''
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from gomoku import GomokuPos, symmetric_pos
+
+logger = logging.getLogger(__name__)
+
+# biến môi trường chọn file bộ nhớ đệm thay cho file mặc định
+CACHE_FILE_ENV = 'GOMOKU_CACHE_FILE'
+# thời gian (giây) chờ khi file đang bị tiến trình khác khóa
+BUSY_TIMEOUT = 5.0
+# số lần ghi giữa 2 lần kiểm tra kích thước
+EVICT_INTERVAL = 64
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS positions (
+    key INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    move INTEGER NOT NULL,
+    score INTEGER,
+    depth INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (key, size)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS positions_last_used ON positions (last_used);
+'''
+
+
+def default_cache_file():
+    ''' File bộ nhớ đệm mặc định: GOMOKU_CACHE_FILE nếu có, ngược lại gomoku/position_cache.sqlite3 trong thư mục cache của người dùng '''
+    path = os.environ.get(CACHE_FILE_ENV)
+    if path:
+        return path
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or (os.name == 'nt' and os.environ.get('LOCALAPPDATA')) \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_dir, 'gomoku', 'position_cache.sqlite3')
+
+
+# file mặc định, được các ứng dụng mở khi khởi động (mỗi người dùng một file, không nằm trong thư mục mã nguồn)
+CACHE_FILE = default_cache_file()
+# open_cache chỉ ghi log lần đầu tiên không mở được bộ nhớ đệm
+_open_failed_logged = False
+
+
+def _signed(key):
+    ''' SQLite chỉ lưu được số nguyên 64 bit có dấu '''
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def open_cache(path=CACHE_FILE, max_entries=100000):
+    '''
+    Mở bộ nhớ đệm tại path (tạo thư mục nếu chưa có), trả về None nếu không mở được (ví dụ thư mục không ghi được
+    hoặc file bị khóa); chỉ lần đầu tiên không mở được trong tiến trình được ghi log
+    '''
+    global _open_failed_logged
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return PositionCache(path, max_entries)
+    except (OSError, sqlite3.Error) as e:
+        if not _open_failed_logged:
+            _open_failed_logged = True
+            logger.warning("Position cache %s cannot be opened, searching without it: %s", path, e)
+        return None
+
+
+class PositionCache:
+    """
+    Bộ nhớ đệm các thế cờ đã tìm kiếm, lưu trong file SQLite path\n
+    Usage:\n
+    cache.lookup(game, depth) trả về nước đi đã lưu với độ sâu ít nhất là depth (hoặc None),
+    cache.store(game, move, score, depth) lưu kết quả tìm kiếm, cache.stats() trả về các bộ đếm (kể cả tỉ lệ trúng)\n
+    Lỗi của SQLite (ví dụ file bị khóa quá lâu) chỉ làm bỏ qua việc tra cứu / ghi, không làm hỏng việc tìm kiếm
+    """
+    def __init__(self, path=CACHE_FILE, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        # dùng được từ luồng khác với luồng tạo ra nó (ví dụ luồng tìm kiếm của giao diện), lock đảm bảo mỗi lúc chỉ 1 luồng dùng
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        try:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.executescript(_SCHEMA)
+        except sqlite3.Error:
+            self.connection.close()
+            raise
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def lookup(self, game, depth):
+        ''' Trả về nước đi đã lưu cho người chơi đang tới lượt của game nếu nó được tìm với độ sâu ít nhất là depth, ngược lại None '''
+        key, symmetry = game.canonical_key()
+        try:
+            with self.lock:
+                row = self.connection.execute('SELECT move, depth FROM positions WHERE key = ? AND size = ?',
+                                              (_signed(key), game.size)).fetchone()
+                if row is not None and row[1] >= depth:
+                    self.connection.execute('UPDATE positions SET last_used = ? WHERE key = ? AND size = ?',
+                                            (time.time(), _signed(key), game.size))
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+
+        move = None
+        if row is not None and row[1] >= depth:
+            move = GomokuPos(*symmetric_pos(*divmod(row[0], game.size), symmetry, inverse=True, size=game.size))
+            # khóa trùng nhau (rất hiếm) có thể trả về một ô đã có quân
+            if game.have_occupied(move):
+                move = None
+        if move is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return move
+
+    def store(self, game, move, score, depth):
+        ''' Lưu nước đi move (điểm score, độ sâu depth) của thế cờ game, kết quả đã lưu chỉ bị thay bởi kết quả sâu hơn hoặc bằng '''
+        key, symmetry = game.canonical_key()
+        x, y = symmetric_pos(move.x, move.y, symmetry, size=game.size)
+        try:
+            with self.lock:
+                self.connection.execute(
+                    'INSERT INTO positions (key, size, move, score, depth, last_used) VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (key, size) DO UPDATE SET move = excluded.move, score = excluded.score, '
+                    'depth = excluded.depth, last_used = excluded.last_used WHERE excluded.depth >= positions.depth',
+                    (_signed(key), game.size, x * game.size + y, score, depth, time.time()))
+                self.stores += 1
+                if self.stores % EVICT_INTERVAL == 0:
+                    self._evict()
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _evict(self):
+        ''' Xóa các thế cờ lâu nhất không dùng khi số thế cờ vượt quá max_entries '''
+        count = self.connection.execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute('DELETE FROM positions WHERE (key, size) IN '
+                                    '(SELECT key, size FROM positions ORDER BY last_used LIMIT ?)', (count - self.max_entries,))
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+
+    def stats(self):
+        ''' Các bộ đếm của tiến trình hiện tại, dùng để đánh giá hiệu quả của bộ nhớ đệm '''
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'errors': self.errors,
+        }
+
+    def close(self):
+        self.connection.close()
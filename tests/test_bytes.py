@@ -0,0 +1,95 @@
+'''
+Kiểm tra Gomoku.to_bytes / from_bytes: giải mã lại phải cho đúng bàn cờ và mọi trạng thái tính từ bàn cờ,
+với định dạng phiên bản 2, phiên bản 1 cũ, kết quả win() lưu kèm và các bàn cờ có số ô không chia hết cho 4
+
+Usage:
+    python -m pytest -q tests
+'''
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gomoku import BOARD_SIZE, BYTES_FORMAT_VERSION, BYTES_HEADER_SIZES, WIN_LENGTH, Gomoku, GomokuPos
+from gomoku_bitboard import BitboardGomoku
+from gomoku_numpy import NumpyGomoku
+
+from test_win import random_move, tie_board
+
+# (size, win_length) được kiểm tra; 15, 9 và 7 có số ô lẻ nên byte cuối cùng có các ô thêm vào
+GEOMETRIES = [(BOARD_SIZE, WIN_LENGTH), (15, 5), (12, 6), (9, 5), (7, 5)]
+
+
+def random_game(size, win_length, seed, moves):
+    ''' Ván cờ ngẫu nhiên (cố định theo seed) dừng sau moves nước hoặc khi có người thắng '''
+    rng = random.Random(seed)
+    game = Gomoku(size=size, win_length=win_length)
+    for _ in range(moves):
+        game.move(GomokuPos(*random_move(game.board, size, rng)))
+        if game.win() != 'N':
+            break
+    return game
+
+
+def check_same(decoded, game):
+    ''' So sánh bàn cờ đã giải mã với bàn cờ ban đầu '''
+    assert (decoded.size, decoded.win_length) == (game.size, game.win_length)
+    assert decoded.board == game.board
+    assert decoded.active_turn == game.active_turn
+    assert decoded.last_move == game.last_move
+    assert decoded.stone_count == game.stone_count
+    assert decoded.zobrist_key == game.zobrist_key
+    assert decoded.neighbour_counts == game.neighbour_counts
+    assert decoded.win() == game.win()
+
+
+@pytest.mark.parametrize('size, win_length', GEOMETRIES)
+def test_round_trip(size, win_length):
+    for seed, moves in ((0, 0), (1, 1), (2, 12), (3, 200)):
+        game = random_game(size, win_length, seed, moves)
+        data = game.to_bytes()
+        assert data[0] == BYTES_FORMAT_VERSION
+        assert len(data) == BYTES_HEADER_SIZES[BYTES_FORMAT_VERSION] + (size * size + 3) // 4
+        check_same(Gomoku.from_bytes(data), game)
+        for backend in (BitboardGomoku, NumpyGomoku):
+            decoded = backend.from_bytes(data)
+            assert (decoded.active_turn, decoded.zobrist_key, decoded.win()) == (game.active_turn, game.zobrist_key, game.win())
+            assert all(decoded.cell(x, y) == game.board[x][y] for x in range(size) for y in range(size))
+        # giải mã rồi mã hóa lại cho đúng chuỗi byte ban đầu
+        assert Gomoku.from_bytes(data).to_bytes() == data
+
+
+def test_version_1():
+    # phiên bản 1: header 5 byte, không lưu kích thước bàn cờ (luôn là bàn cờ mặc định)
+    game = random_game(BOARD_SIZE, WIN_LENGTH, 4, 30)
+    data = game.to_bytes()
+    old_data = bytes([1]) + data[1:5] + data[BYTES_HEADER_SIZES[2]:]
+    assert len(old_data) == BYTES_HEADER_SIZES[1] + (BOARD_SIZE * BOARD_SIZE + 3) // 4
+    check_same(Gomoku.from_bytes(old_data), game)
+    assert Gomoku.peek_status(old_data) == game.win()
+    with pytest.raises(ValueError):
+        Gomoku.from_bytes(bytes([BYTES_FORMAT_VERSION + 1]) + data[1:])
+
+
+@pytest.mark.parametrize('size, win_length', [(BOARD_SIZE, WIN_LENGTH), (9, 5)])
+def test_cached_status(size, win_length):
+    # chưa kết thúc
+    game = random_game(size, win_length, 5, 4)
+    assert Gomoku.peek_status(game.to_bytes()) == 'N'
+    # có người thắng
+    game = random_game(size, win_length, 6, size * size)
+    status = game.win()
+    assert status in ('X', 'O')
+    assert Gomoku.peek_status(game.to_bytes()) == status
+    # hòa: bàn cờ đầy không có 5 quân liên tiếp
+    game = Gomoku(size=size, win_length=win_length)
+    game.board = tie_board(size)
+    game.stone_count = size * size
+    data = game.to_bytes()
+    assert Gomoku.peek_status(data) == 'T'
+    assert Gomoku.from_bytes(data).win() == 'T'
+    # status đã biết được lưu nguyên, không tính lại
+    assert Gomoku.peek_status(Gomoku(size=size, win_length=win_length).to_bytes(status='X')) == 'X'
@@ -0,0 +1,62 @@
+'''
+Kiểm tra OpeningBook: tra cứu trên các bàn cờ đối xứng và điều kiện độ sâu đã tạo ra book (phiên bản 1 không có độ sâu)
+
+Usage:
+    python -m pytest -q tests
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gomoku import MAX_DEPTH, Gomoku, GomokuPos, symmetric_pos
+from opening_book import BOOK_FILE, BOOK_HEADER, BOOK_MAGIC, OpeningBook, write_book
+
+MOVES = [(9, 9), (10, 11), (8, 12)]
+
+
+def play(moves, symmetry=0):
+    ''' Bàn cờ sau các nước moves, đã được biến đổi bởi phép đối xứng symmetry '''
+    game = Gomoku()
+    for x, y in moves:
+        game.move(GomokuPos(*symmetric_pos(x, y, symmetry)))
+    return game
+
+
+def write_test_book(path, depth):
+    ''' Book chỉ có thế cờ MOVES, nước đi (11, 10) '''
+    key, symmetry = play(MOVES).canonical_key()
+    write_book(path, {key: symmetric_pos(11, 10, symmetry)}, len(MOVES), depth)
+
+
+def test_lookup_and_depth(tmp_path):
+    path = str(tmp_path / 'book.bin')
+    write_test_book(path, 4)
+    book = OpeningBook(path)
+    assert (book.depth, len(book)) == (4, 1)
+    for symmetry in range(8):
+        assert book.lookup(play(MOVES, symmetry), 4) == GomokuPos(*symmetric_pos(11, 10, symmetry))
+    # book nông hơn max_depth của bot không được dùng
+    assert book.lookup(play(MOVES), 5) is None
+    assert book.lookup(play(MOVES[:2]), 4) is None
+    book.close()
+
+
+def test_version_1_is_never_used(tmp_path):
+    path = str(tmp_path / 'book.bin')
+    write_test_book(path, 4)
+    with open(path, 'r+b') as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, 1, 20, len(MOVES), 0))
+    book = OpeningBook(path)
+    assert book.depth == 0
+    assert book.lookup(play(MOVES)) is not None
+    assert book.lookup(play(MOVES), 1) is None
+    book.close()
+
+
+def test_shipped_book_depth():
+    # book đi kèm được tạo với độ sâu mặc định của bot nên bot mặc định dùng được
+    book = OpeningBook(BOOK_FILE)
+    assert book.depth >= MAX_DEPTH
+    assert book.lookup(Gomoku(), MAX_DEPTH) is not None
+    book.close()
@@ -0,0 +1,108 @@
+'''
+Kiểm tra PositionCache: tra cứu trên các bàn cờ đối xứng, điều kiện độ sâu, xóa các thế cờ lâu nhất không dùng,
+và open_cache (file mặc định, biến môi trường, ghi log một lần khi không mở được)
+
+Usage:
+    python -m pytest -q tests
+'''
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import position_cache
+from gomoku import Gomoku, GomokuPos, symmetric_pos
+from position_cache import EVICT_INTERVAL, PositionCache, default_cache_file, open_cache
+
+# các nước đầu ván không đối xứng, để 8 bàn cờ đối xứng đều khác nhau
+MOVES = [(9, 9), (10, 11), (8, 12), (13, 7)]
+
+
+def play(moves, symmetry=0, size=20):
+    ''' Bàn cờ sau các nước moves, đã được biến đổi bởi phép đối xứng symmetry '''
+    game = Gomoku(size=size)
+    for x, y in moves:
+        game.move(GomokuPos(*symmetric_pos(x, y, symmetry, size=size)))
+    return game
+
+
+def test_symmetric_lookup(tmp_path):
+    cache = PositionCache(str(tmp_path / 'cache.sqlite3'))
+    cache.store(play(MOVES), GomokuPos(11, 10), 100, 4)
+    boards = [play(MOVES, symmetry) for symmetry in range(8)]
+    assert len({tuple(map(tuple, game.board)) for game in boards}) == 8
+    for symmetry, game in enumerate(boards):
+        # nước đi trả về là nước đã lưu sau cùng phép đối xứng của bàn cờ
+        assert cache.lookup(game, 4) == GomokuPos(*symmetric_pos(11, 10, symmetry))
+    # bàn cờ khác kích thước không dùng chung kết quả
+    assert cache.lookup(play(MOVES, size=15), 4) is None
+    assert cache.stats()['hits'] == 8 and cache.stats()['misses'] == 1
+    cache.close()
+
+
+def test_depth_gating(tmp_path):
+    cache = PositionCache(str(tmp_path / 'cache.sqlite3'))
+    game = play(MOVES)
+    cache.store(game, GomokuPos(11, 10), 100, 4)
+    assert cache.lookup(game, 4) == GomokuPos(11, 10)
+    # kết quả nông hơn độ sâu yêu cầu không được dùng
+    assert cache.lookup(game, 5) is None
+    # kết quả nông hơn không thay kết quả đã lưu, kết quả sâu hơn thì có
+    cache.store(game, GomokuPos(7, 7), 0, 2)
+    assert cache.lookup(game, 3) == GomokuPos(11, 10)
+    cache.store(game, GomokuPos(7, 8), 50, 6)
+    assert cache.lookup(game, 5) == GomokuPos(7, 8)
+    cache.close()
+
+
+def test_eviction(tmp_path):
+    cache = PositionCache(str(tmp_path / 'cache.sqlite3'), max_entries=EVICT_INTERVAL // 2)
+    game = play(MOVES)
+    stored = []
+    # mỗi thế cờ là MOVES thêm một quân tại một ô khác nhau của 7 dòng đầu (MOVES không đối xứng nên các thế cờ đều khác nhau)
+    for cell in range(EVICT_INTERVAL - 1):
+        game.move(GomokuPos(*divmod(cell, 10)))
+        cache.store(game, GomokuPos(19, 19), 0, 4)
+        stored.append(game.canonical_key()[0])
+        game.undo_move()
+    # số thế cờ chỉ được kiểm tra sau mỗi EVICT_INTERVAL lần ghi
+    assert len(cache) == EVICT_INTERVAL - 1
+    # thế cờ đầu tiên vừa được dùng lại nên không bị xóa
+    game.move(GomokuPos(0, 0))
+    assert cache.lookup(game, 4) is not None
+    game.undo_move()
+    game.move(GomokuPos(15, 15))
+    cache.store(game, GomokuPos(19, 19), 0, 4)
+    game.undo_move()
+    assert len(cache) == cache.max_entries
+    remaining = {row[0] for row in cache.connection.execute('SELECT key FROM positions')}
+    kept = [key for key in stored if position_cache._signed(key) in remaining]
+    # giữ lại thế cờ vừa dùng, thế cờ ghi sau cùng và các thế cờ được ghi gần nhất
+    assert kept == [stored[0]] + stored[-(cache.max_entries - 2):]
+    cache.close()
+
+
+def test_default_file(monkeypatch, tmp_path):
+    monkeypatch.setenv('GOMOKU_CACHE_FILE', str(tmp_path / 'custom.sqlite3'))
+    assert default_cache_file() == str(tmp_path / 'custom.sqlite3')
+    monkeypatch.delenv('GOMOKU_CACHE_FILE')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    path = default_cache_file()
+    assert path == os.path.join(str(tmp_path / 'xdg'), 'gomoku', 'position_cache.sqlite3')
+    # open_cache tạo thư mục nếu chưa có
+    cache = open_cache(path)
+    assert cache is not None and os.path.exists(path)
+    cache.close()
+
+
+def test_open_failure_logged_once(monkeypatch, tmp_path, caplog):
+    monkeypatch.setattr(position_cache, '_open_failed_logged', False)
+    # thư mục cha là một file nên không tạo được file bộ nhớ đệm
+    blocker = tmp_path / 'blocker'
+    blocker.write_text('')
+    path = str(blocker / 'cache.sqlite3')
+    with caplog.at_level(logging.WARNING, logger='position_cache'):
+        assert open_cache(path) is None
+        assert open_cache(path) is None
+    assert len(caplog.records) == 1
@@ -0,0 +1,193 @@
+'''
+Kiểm tra ThreatSpaceSearch trên các thế cờ đã biết kết quả\n
+Mỗi chuỗi thắng tìm được đều được kiểm tra lại độc lập: người phòng thủ được thử mọi ô trống,
+người tấn công đi theo chuỗi VCT của ThreatSpaceSearch, chuỗi chỉ đúng nếu luôn kết thúc bằng 5 quân liên tiếp (full_scan_win)
+
+Usage:
+    python -m pytest -q tests
+'''
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gomoku import Gomoku
+from threat_search import MAX_NODES, ThreatSpaceSearch, _set_turn
+
+from test_win import full_scan_win
+
+# không giới hạn số trạng thái: dùng để kiểm tra lại kết quả
+UNBOUNDED = 10 ** 6
+
+# X đi: (4, 4) tạo 2 đường 4 bị chặn 1 đầu cùng lúc (hàng 4 và cột 4), O chỉ chặn được 1
+VCF = [
+    "O...O.....",
+    "....X.....",
+    "....X.....",
+    "....X.....",
+    "OXXX......",
+    "..........",
+    "........O.",
+    "..........",
+    "..........",
+    ".....O...O",
+]
+
+# X đi: không có VCF (đường 4 duy nhất ở hàng 8 bị chặn ngay), nhưng (4, 5) tạo 2 đường 3 mở (hàng 4 và cột 5);
+# đường 3 bị chặn ở hàng 8 cho phép tìm VCT
+VCT = [
+    "O........O",
+    "..........",
+    ".O...X....",
+    ".....X....",
+    "...XX.....",
+    "..........",
+    "........O.",
+    "..........",
+    "OXXX......",
+    ".....O...O",
+]
+
+# chỉ có các quân rời rạc
+QUIET = [
+    "..........",
+    "..........",
+    "..X.......",
+    "......O...",
+    "..........",
+    "....X.....",
+    "..........",
+    "........O.",
+    "..........",
+    "..........",
+]
+
+# X đi, X không có hăm dọa nào; nếu X bỏ lượt, O có VCF tại (4, 4) giống thế cờ VCF
+DEFENCE = [
+    "X...X.....",
+    "....O.....",
+    "....O.....",
+    "....O.....",
+    "XOOO......",
+    "..........",
+    "........X.",
+    "..........",
+    "..........",
+    ".....X...X",
+]
+
+# X đi, O có đường 4 mở ở hàng 5
+OPEN_FOUR = [
+    "X........X",
+    "..........",
+    "..........",
+    "..........",
+    "..........",
+    "...OOOO...",
+    "..........",
+    "..........",
+    "..........",
+    "X........X",
+]
+
+
+def load(rows, active_turn='X'):
+    ''' Tạo Gomoku từ các dòng của bàn cờ ('.' là ô trống) '''
+    return Gomoku.deserialize(json.dumps({
+        'board': [['N' if cell == '.' else cell for cell in row] for row in rows],
+        'active_turn': active_turn,
+    }))
+
+
+def is_forced_win(game, attacker, plies):
+    '''
+    Kiểm tra độc lập chuỗi thắng của attacker trong plies nước: attacker đi theo chuỗi VCT (gồm cả VCF) của ThreatSpaceSearch,
+    người phòng thủ được thử mọi ô trống
+    '''
+    status = full_scan_win(game.board, game.size, game.win_length)
+    if status != 'N':
+        return status == attacker
+    if plies <= 0:
+        return False
+    if game.active_turn == attacker:
+        move = ThreatSpaceSearch(max_nodes=UNBOUNDED)._attack(game, attacker, plies, True)
+        if move is None:
+            return False
+        game.move(move)
+        won = is_forced_win(game, attacker, plies - 1)
+        game.undo_move()
+        return won
+    for x in range(game.size):
+        for y in range(game.size):
+            if game.board[x][y] == 'N':
+                game.move(game.geometry.positions[x * game.size + y])
+                won = is_forced_win(game, attacker, plies - 1)
+                game.undo_move()
+                if not won:
+                    return False
+    return True
+
+
+def test_finds_vcf():
+    game = load(VCF)
+    tss = ThreatSpaceSearch()
+    move = tss.search(game)
+    assert (move.x, move.y) == (4, 4)
+    assert tss.kind == 'VCF'
+    assert tss.nodes <= MAX_NODES
+    assert is_forced_win(game, 'X', 3)
+
+
+def test_finds_vct_within_vct_plies():
+    game = load(VCT)
+    tss = ThreatSpaceSearch(max_nodes=UNBOUNDED)
+    move = tss.search(game)
+    assert tss.kind == 'VCT'
+    assert is_forced_win(game, 'X', tss.vct_plies)
+    # chuỗi dài hơn 3 nước nên không tìm được nếu vct_plies = 3
+    assert ThreatSpaceSearch(max_nodes=UNBOUNDED, vct_plies=3).search(game) is None
+    # kết quả chỉ phụ thuộc số trạng thái, không phụ thuộc tốc độ máy
+    assert ThreatSpaceSearch(max_nodes=UNBOUNDED).search(game) == move
+
+
+def test_quiet_position_returns_none():
+    for active_turn in ('X', 'O'):
+        tss = ThreatSpaceSearch(max_nodes=UNBOUNDED)
+        assert tss.search(load(QUIET, active_turn)) is None
+        assert tss.kind is None
+
+
+def test_forced_defence():
+    game = load(DEFENCE)
+    # nếu X bỏ lượt, O thắng ép buộc
+    _set_turn(game, 'O')
+    assert is_forced_win(game, 'O', 3)
+    _set_turn(game, 'X')
+
+    tss = ThreatSpaceSearch(max_nodes=UNBOUNDED)
+    move = tss.search(game)
+    assert (move.x, move.y) == (4, 4)
+    assert tss.kind == 'defence'
+    # sau nước chặn, O không còn VCF lẫn VCT
+    game.move(move)
+    assert ThreatSpaceSearch(max_nodes=UNBOUNDED).search(game) is None
+
+
+def test_unstoppable_threat_returns_none():
+    # O có đường 4 mở: không nước nào của X chặn được, alpha-beta sẽ chọn nước đi
+    tss = ThreatSpaceSearch(max_nodes=UNBOUNDED)
+    assert tss.search(load(OPEN_FOUR)) is None
+    assert tss.kind is None
+
+
+def test_budget_stop_and_deadline():
+    game = load(VCT)
+    # VCT cần 37 trạng thái: bị cắt bởi max_nodes, kết quả không phụ thuộc tốc độ máy
+    tss = ThreatSpaceSearch(max_nodes=20)
+    assert tss.search(game) is None and tss.kind is None
+    assert tss.nodes == 21
+    # stop() và deadline của người gọi được kiểm tra sau mỗi 16 trạng thái
+    tss = ThreatSpaceSearch(max_nodes=UNBOUNDED)
+    assert tss.search(game, stop=lambda: True) is None and tss.nodes == 16
+    assert tss.search(game, deadline=0.0) is None and tss.nodes == 16
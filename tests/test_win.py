@@ -0,0 +1,180 @@
+'''
+Kiểm tra đối chiếu: các cách tính nhanh (win(last_move_only=True), threat_scores có / không có enable_threat_tracking,
+bitboard, numpy, get_lite_best_moves) phải cho cùng kết quả với cách duyệt toàn bộ bàn cờ ban đầu
+trên các ván cờ ngẫu nhiên (cố định theo seed), tại mọi nước đi
+
+Usage:
+    python -m pytest -q tests
+'''
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gomoku import BOARD_SIZE, WIN_LENGTH, Gomoku, GomokuPos, get_threatening_patterns, stack_threatening_point
+from gomoku_bitboard import BitboardGomoku
+from gomoku_numpy import NumpyGomoku
+
+# (size, win_length) được kiểm tra
+GEOMETRIES = [(BOARD_SIZE, WIN_LENGTH), (15, 5), (10, 5), (12, 6)]
+SEEDS = range(3)
+# xác suất lùi lại 1 nước sau mỗi nước đi (để kiểm tra cả undo_move)
+UNDO_PROBABILITY = 0.15
+
+
+def full_scan_win(board, size, win_length):
+    ''' Cách kiểm tra thắng ban đầu: duyệt mọi cửa sổ win_length ô theo 4 hướng trên toàn bộ bàn cờ '''
+    for x in range(size):
+        for y in range(size):
+            stone = board[x][y]
+            if stone == 'N':
+                continue
+            for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_x, end_y = x + dx * (win_length - 1), y + dy * (win_length - 1)
+                if 0 <= end_x < size and 0 <= end_y < size and \
+                        all(board[x + dx * k][y + dy * k] == stone for k in range(win_length)):
+                    return stone
+    if all(cell != 'N' for row in board for cell in row):
+        return 'T'
+    return 'N'
+
+
+def full_scan_threats(board, size, win_length, opponent):
+    '''
+    Cách tìm vị trí hăm dọa ban đầu: với mỗi mẫu, duyệt lần lượt các dòng, các cột rồi từng cặp đường chéo từ dưới lên\n
+    Trả về ([((x, y), điểm hăm dọa)] theo thứ tự tìm thấy lần đầu, điểm hăm dọa cao nhất)
+    '''
+    rows = [[(i, j) for j in range(size)] for i in range(size)]
+    columns = [[(i, j) for i in range(size)] for j in range(size)]
+    diagonals = []
+    for di in range(size - 1, -size, -1):
+        cells = range(max(0, di), min(size, di + size))
+        diagonals.append([(i, i - di) for i in cells])
+        diagonals.append([(i, size - 1 - (i - di)) for i in cells])
+
+    scores = {}
+    for pattern in get_threatening_patterns(opponent, win_length):
+        threatening_point = pattern.count(opponent) - (win_length - 5)
+        for line in rows + columns + diagonals:
+            for i in range(len(line) - len(pattern) + 1):
+                if ''.join(board[x][y] for x, y in line[i:i+len(pattern)]) != pattern:
+                    continue
+                for k, char in enumerate(pattern):
+                    if char == 'N':
+                        cell = line[i+k]
+                        if cell in scores:
+                            scores[cell] = stack_threatening_point(scores[cell], threatening_point)
+                        else:
+                            scores[cell] = threatening_point
+    if not scores:
+        return [], 0
+    return list(scores.items()), max(scores.values())
+
+
+def full_scan_lite_moves(board, size, me):
+    ''' Cách tìm lite-best moves ban đầu: đếm quân giống ở 8 ô xung quanh mọi ô trống, ưu tiên ô gần tâm '''
+    best_moves = []
+    max_allies = -1
+    for i in range(size):
+        for j in range(size):
+            if board[i][j] != 'N':
+                continue
+            num_allies = sum(1 for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                             if (dx, dy) != (0, 0) and 0 <= i + dx < size and 0 <= j + dy < size and board[i+dx][j+dy] == me)
+            if num_allies > max_allies:
+                best_moves = [(i, j)]
+                max_allies = num_allies
+            elif num_allies == max_allies:
+                best_moves.append((i, j))
+    if len(best_moves) < 4:
+        return best_moves
+    center = GomokuPos(size // 2, size // 2)
+    best_moves.sort(key=lambda cell: GomokuPos.distance_between(center, GomokuPos(*cell)))
+    return best_moves[0:4]
+
+
+def make_boards(size, win_length):
+    ''' Các bàn cờ được so sánh, cùng nhận mọi nước đi: Gomoku, Gomoku có enable_threat_tracking, bitboard, numpy '''
+    tracked = Gomoku(size=size, win_length=win_length)
+    tracked.enable_threat_tracking()
+    return {
+        'list': Gomoku(size=size, win_length=win_length),
+        'tracked': tracked,
+        'bitboard': BitboardGomoku(size=size, win_length=win_length),
+        'numpy': NumpyGomoku(size=size, win_length=win_length),
+    }
+
+
+def random_move(board, size, rng):
+    ''' Một ô trống ngẫu nhiên cách quân gần nhất không quá 2 ô (để các mẫu hăm dọa xuất hiện thường xuyên) '''
+    near = [(x, y) for x in range(size) for y in range(size) if board[x][y] == 'N' and
+            any(board[i][j] != 'N' for i in range(max(0, x - 2), min(size, x + 3)) for j in range(max(0, y - 2), min(size, y + 3)))]
+    if not near:
+        return size // 2, size // 2
+    return rng.choice(near)
+
+
+def check_position(boards, size, win_length):
+    ''' So sánh mọi bàn cờ với cách duyệt toàn bộ ban đầu tại trạng thái hiện tại, trả về kết quả win '''
+    board = boards['list'].board
+    expected_win = full_scan_win(board, size, win_length)
+    for name, game in boards.items():
+        assert game.win() == expected_win, name
+        assert game.win(last_move_only=True) == expected_win, name
+    for player in ('X', 'O'):
+        expected_threats = full_scan_threats(board, size, win_length, player)
+        expected_lite_moves = full_scan_lite_moves(board, size, player)
+        for name, game in boards.items():
+            scores, max_point = game.threat_scores(player)
+            assert ([((pos.x, pos.y), point) for pos, point in scores], max_point) == expected_threats, (name, player)
+            positions, max_point = game.get_threatening_positions(player)
+            assert ([((pos.x, pos.y), pos.threatening) for pos in positions], max_point) == expected_threats, (name, player)
+            assert [(pos.x, pos.y) for pos in game.get_lite_best_moves(player)] == expected_lite_moves, (name, player)
+    return expected_win
+
+
+@pytest.mark.parametrize('size, win_length', GEOMETRIES)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_random_games(size, win_length, seed):
+    rng = random.Random(seed * 1000 + size * 10 + win_length)
+    boards = make_boards(size, win_length)
+    status = check_position(boards, size, win_length)
+    while status == 'N':
+        x, y = random_move(boards['list'].board, size, rng)
+        for game in boards.values():
+            game.move(GomokuPos(x, y))
+        status = check_position(boards, size, win_length)
+        if status == 'N' and boards['list'].stone_count > 1 and rng.random() < UNDO_PROBABILITY:
+            for game in boards.values():
+                game.undo_move()
+            status = check_position(boards, size, win_length)
+
+
+def tie_board(size):
+    ''' Một bàn cờ đầy không có 5 quân liên tiếp: mỗi dòng là các cặp XX / OO xen kẽ, dòng sau đổi màu so với dòng trước '''
+    return [['X' if (y // 2 + x) % 2 == 0 else 'O' for y in range(size)] for x in range(size)]
+
+
+@pytest.mark.parametrize('size, win_length', [(BOARD_SIZE, WIN_LENGTH), (10, 5), (12, 6)])
+def test_full_board_tie(size, win_length):
+    board = tie_board(size)
+    assert full_scan_win(board, size, win_length) == 'T'
+    # đi xen kẽ các quân X và O của bàn cờ hòa, nước cuối cùng làm đầy bàn cờ
+    stones = {player: [(x, y) for x in range(size) for y in range(size) if board[x][y] == player] for player in ('X', 'O')}
+    assert len(stones['X']) == len(stones['O'])
+    rng = random.Random(size)
+    for cells in stones.values():
+        rng.shuffle(cells)
+    boards = make_boards(size, win_length)
+    for x_cell, o_cell in zip(stones['X'], stones['O']):
+        for cell in (x_cell, o_cell):
+            for game in boards.values():
+                game.move(GomokuPos(*cell))
+            expected = full_scan_win(boards['list'].board, size, win_length)
+            for name, game in boards.items():
+                assert game.win() == expected, name
+                assert game.win(last_move_only=True) == expected, name
+    assert all(game.win(last_move_only=True) == 'T' for game in boards.values())
@@ -0,0 +1,213 @@
+'''
+Threat-space search: tìm chuỗi nước đi ép buộc trước khi chạy alpha-beta
+
+Theo "Go-Moku and Threat-Space Search" (Allis và cộng sự): người tấn công chỉ đi những nước tạo ra hăm dọa
+(đường 4 cho VCF - victory by continuous fours, thêm đường 3 mở cho VCT - victory by continuous threats),
+người phòng thủ chỉ cần xét những nước chặn hăm dọa đó (và những nước tạo ra đường 4 của chính mình).
+Vì số nước đi ở mỗi trạng thái rất nhỏ, chuỗi thắng dài hơn nhiều so với MAX_DEPTH có thể được tìm thấy rất nhanh.
+Các mẫu hăm dọa được lấy từ Gomoku.threat_scores
+'''
+import time
+
+from gomoku import SearchAborted
+from gomoku_bitboard import BitboardGomoku
+
+# điểm hăm dọa của ô mà khi đi vào sẽ tạo ra 5 quân liên tiếp / tạo ra đường 4 / tạo ra đường 3
+FIVE_POINT = 4
+FOUR_POINT = 3
+THREE_POINT = 2
+# số trạng thái tối đa của mỗi lần gọi search, khoảng vài ms: nhỏ hơn nhiều so với một lần tìm kiếm alpha-beta thông thường
+MAX_NODES = 40
+
+
+def _other(player):
+    return 'O' if player == 'X' else 'X'
+
+
+def _cells(scores, min_point):
+    '''
+    Các vị trí có điểm hăm dọa ít nhất là min_point, điểm cao trước (giữ nguyên thứ tự tìm thấy nếu bằng điểm)\n
+    scores là danh sách (vị trí, điểm hăm dọa) của Gomoku.threat_scores
+    '''
+    cells = [(pos, point) for pos, point in scores if point >= min_point]
+    cells.sort(key=lambda cell: -cell[1])
+    return [pos for pos, _ in cells]
+
+
+def _makes_open_four(state, x, y, player):
+    ''' Kiểm tra nếu player đi vào ô (x, y) thì có tạo ra đường 4 mở (N + win_length - 1 quân liên tiếp + N) không '''
+    size = state.size
+    for dx, dy in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        ends = []
+        stones = 1
+        for sign in (1, -1):
+            i, j = x + sign * dx, y + sign * dy
+            while 0 <= i < size and 0 <= j < size and state.cell(i, j) == player:
+                stones += 1
+                i, j = i + sign * dx, j + sign * dy
+            ends.append(0 <= i < size and 0 <= j < size and state.cell(i, j) == 'N')
+        if stones == state.win_length - 1 and all(ends):
+            return True
+    return False
+
+
+def _set_turn(state, player):
+    ''' Đổi lượt đi của state thành player (giống như người chơi kia bỏ lượt) '''
+    if state.active_turn != player:
+        state.active_turn = player
+        state.zobrist_key ^= state.geometry.zobrist_side_key
+
+
+class ThreatSpaceSearch:
+    """
+    Tìm nhanh nước thắng ép buộc (VCF rồi VCT) của người chơi đang tới lượt, hoặc nước chặn chuỗi thắng ép buộc của đối thủ\n
+    max_nodes giới hạn mỗi lần gọi search (mặc định chỉ giới hạn theo số trạng thái nên kết quả không phụ thuộc tốc độ máy),
+    time_limit_ms (nếu có) giới hạn thêm theo thời gian, max_plies giới hạn độ dài chuỗi VCF, vct_plies độ dài chuỗi VCT\n
+    VCT chỉ được tìm cho người chơi đã có đường 3 trên bàn cờ\n
+    backend là lớp bàn cờ dùng khi tìm kiếm (mặc định bitboard vì chỉ cần move, undo_move và threat_scores)\n
+    Usage:\n
+    move = ThreatSpaceSearch().search(game), None nếu không tìm thấy gì; kind cho biết loại kết quả ('VCF', 'VCT', 'defence')
+    """
+    def __init__(self, max_nodes=MAX_NODES, time_limit_ms=None, max_plies=25, vct_plies=7, backend=BitboardGomoku):
+        self.backend = backend
+        self.max_nodes = max_nodes
+        self.time_limit_ms = time_limit_ms
+        self.max_plies = max_plies
+        self.vct_plies = vct_plies
+        self.nodes = 0
+        self.kind = None
+        self._deadline = None
+        self._stop = None
+
+    def search(self, game, deadline=None, stop=None):
+        '''
+        Trả về nước đi cho người chơi đang tới lượt của game (không thay đổi game):\n
+        nước đầu tiên của một chuỗi thắng ép buộc, hoặc nếu đối thủ có chuỗi thắng ép buộc thì nước chặn được cả VCF và VCT của nó\n
+        deadline (time.perf_counter()) và stop() (trả về True khi cần dừng) là giới hạn của người gọi, ví dụ phần còn lại của time_budget_ms của bot\n
+        Trả về None nếu không tìm thấy, không có nước chặn nào chắc chắn hoặc hết giới hạn
+        '''
+        self.nodes = 0
+        self.kind = None
+        self._deadline = deadline
+        if self.time_limit_ms is not None:
+            own_deadline = time.perf_counter() + self.time_limit_ms / 1000
+            self._deadline = own_deadline if deadline is None else min(deadline, own_deadline)
+        self._stop = stop
+        me = game.active_turn
+        opponent = _other(me)
+        try:
+            state = self.backend(game)
+            move = self._wins(state, me)
+            if move is not None:
+                return move
+
+            # đối thủ được đi thêm một nước (người chơi hiện tại bỏ lượt) có thắng ép buộc không
+            _set_turn(state, opponent)
+            threatened = self._wins(state, opponent) is not None
+            _set_turn(state, me)
+            if threatened:
+                move = self._defence(state, me)
+                self.kind = None if move is None else 'defence'
+                return move
+        except SearchAborted:
+            self.kind = None
+        return None
+
+    def _wins(self, state, attacker):
+        '''
+        attacker đang tới lượt: trả về nước đầu tiên của chuỗi VCF (trong max_plies nước) hoặc VCT (trong vct_plies nước),
+        None nếu không có, kind được gán loại chuỗi tìm thấy\n
+        VCT chỉ được tìm khi attacker đã có đường 3 (ô tạo được đường 4), vì từ các đường 2 rất hiếm khi có VCT ngắn
+        mà việc tìm lại tốn hơn nhiều so với alpha-beta
+        '''
+        move = self._attack(state, attacker, self.max_plies, False)
+        if move is not None:
+            self.kind = 'VCF'
+            return move
+        if state.threat_scores(attacker)[1] >= FOUR_POINT:
+            move = self._attack(state, attacker, self.vct_plies, True)
+            if move is not None:
+                self.kind = 'VCT'
+                return move
+        return None
+
+    def _count_node(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchAborted()
+        if self.nodes % 16 == 0 and ((self._deadline is not None and time.perf_counter() > self._deadline)
+                                     or (self._stop is not None and self._stop())):
+            raise SearchAborted()
+
+    def _attack(self, state, attacker, plies, threes):
+        ''' attacker đang tới lượt: trả về nước đầu tiên của chuỗi thắng ép buộc trong plies nước, None nếu không có '''
+        self._count_node()
+        defender = _other(attacker)
+        scores, _ = state.threat_scores(attacker)
+        fives = _cells(scores, FIVE_POINT)
+        if fives:
+            return fives[0]
+        # cần ít nhất: 1 nước hăm dọa, 1 nước chặn, 1 nước thắng
+        if plies < 3:
+            return None
+
+        candidates = _cells(scores, THREE_POINT if threes else FOUR_POINT)
+        defender_fives = _cells(state.threat_scores(defender)[0], FIVE_POINT)
+        if defender_fives:
+            # phải chặn đường 4 của đối thủ trước, chỉ tiếp tục được nếu nước chặn cũng là một nước hăm dọa
+            candidates = [pos for pos in candidates if pos == defender_fives[0]]
+        for move in candidates:
+            state.move(move)
+            won = self._all_defences_lose(state, attacker, plies - 1, threes)
+            state.undo_move()
+            if won:
+                return move
+        return None
+
+    def _all_defences_lose(self, state, attacker, plies, threes):
+        ''' Người phòng thủ đang tới lượt sau nước đi của attacker: trả về True nếu mọi nước chặn đều thua '''
+        self._count_node()
+        defender = _other(attacker)
+        scores, _ = state.threat_scores(attacker)
+        fives = _cells(scores, FIVE_POINT)
+        defender_scores, _ = state.threat_scores(defender)
+        # người phòng thủ thắng trước nếu có thể tạo ra 5 quân
+        if _cells(defender_scores, FIVE_POINT):
+            return False
+        if len(fives) >= 2:
+            return True
+        if len(fives) == 1:
+            defences = fives
+        elif threes and any(_makes_open_four(state, pos.x, pos.y, attacker)
+                            for pos in _cells(scores, FOUR_POINT)):
+            # đường 3 mở: chặn vào các ô tạo đường 4 của attacker, hoặc phản công bằng đường 4 của mình
+            defences = _cells(scores, FOUR_POINT)
+            defences += [pos for pos in _cells(defender_scores, FOUR_POINT) if pos not in defences]
+        else:
+            # nước vừa đi không phải là hăm dọa
+            return False
+
+        for move in defences:
+            state.move(move)
+            won = self._attack(state, attacker, plies - 1, threes) is not None
+            state.undo_move()
+            if not won:
+                return False
+        return True
+
+    def _defence(self, state, me):
+        '''
+        Đối thủ có chuỗi thắng ép buộc nếu me bỏ lượt: tìm nước của me sau đó đối thủ không còn cả VCF lẫn VCT\n
+        Các nước được thử là các ô hăm dọa của đối thủ và các nước tạo hăm dọa của me,
+        None nếu không có nước nào chặn được (khi đó alpha-beta sẽ chọn nước đi)
+        '''
+        opponent = _other(me)
+        candidates = _cells(state.threat_scores(opponent)[0], THREE_POINT)
+        candidates += [pos for pos in _cells(state.threat_scores(me)[0], FOUR_POINT) if pos not in candidates]
+        for move in candidates:
+            state.move(move)
+            refuted = self._wins(state, opponent) is None
+            state.undo_move()
+            if refuted:
+                return move
+        return None